@@ -10,16 +10,26 @@ Environment variables required (set in Firebase):
   REVALIDATE_URL        - Next.js revalidation webhook URL  
   REVALIDATE_SECRET     - Secret token for revalidation endpoint
   STORAGE_BUCKET        - Firebase Storage bucket name (e.g. your-project.appspot.com)
+
+Optional:
+  DAILY_TOKEN_LIMIT     - Max Gemini tokens (prompt + output) per UTC day (default 400000, 0 = no limit)
+  DAILY_COST_LIMIT_USD  - Max estimated spend per UTC day in USD (default 2.00, 0 = no limit)
+  BLOG_TARGET_LOCALES   - Comma-separated locales translated from English (default "ar")
 """
 
+import difflib
+import hashlib
 import json
+import math
 import re
 import time
 import logging
 import os
 import io
 import traceback
+import uuid
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from urllib.parse import quote
 
@@ -82,9 +92,199 @@ TOPIC_SEED_AREAS = [
     "Appointment booking apps for beauty and health",
 ]
 
+TEXT_MODEL = "gemini-3-flash-preview"
+IMAGE_MODEL = "imagen-4.0-ultra-generate-001"
+
+# Approximate USD list prices — per 1M tokens for Gemini, per image for Imagen.
+# Only used for the cost estimates in the run log and the daily ceiling.
+MODEL_PRICING = {
+    TEXT_MODEL: {"input": 0.50, "cachedInput": 0.05, "output": 3.00},
+    IMAGE_MODEL: {"image": 0.06},
+}
+
+# Output budget for generate_blog_content, adapted per category from history
+DEFAULT_MAX_OUTPUT_TOKENS = 8192
+MIN_MAX_OUTPUT_TOKENS = 4096
+MAX_MAX_OUTPUT_TOKENS = 32768
+OUTPUT_BUDGET_HEADROOM = 1.3     # multiplier over the largest recent output
+OUTPUT_BUDGET_MIN_SAMPLES = 3    # below this, fall back to the default
+OUTPUT_BUDGET_HISTORY = 20       # recent runs per category to consider
+
+# Topic backlog scheduling
+BACKLOG_MIN_PENDING = 5          # never let the backlog drop below this
+BACKLOG_LEAD_DAYS = 14           # keep enough pending topics for this many days of publishing
+BACKLOG_RATE_WINDOW_DAYS = 14    # window used to measure the publishing rate
+BACKLOG_MAX_REFILL = 20          # max ideas generated per refill call
+FAIRNESS_WINDOW = 12             # recently used topics considered for category/area fairness
+TOPIC_AGING_PER_DAY = 0.25       # priority points a pending topic gains per day waiting
+SEED_AREA_PENALTY = 2.0          # priority points lost per recent use of the same seed area
+CATEGORY_WEIGHTS = {             # relative share of posts per category (missing = 1.0)
+    "App Development": 1.5,
+    "AI": 1.5,
+    "Digital Transformation": 1.0,
+    "Business": 1.0,
+    "Mobile": 1.0,
+    "Web": 1.0,
+}
+
+# ─── Usage & Cost Accounting ──────────────────────────────────────────────────
+
+class BudgetExceededError(RuntimeError):
+    """Raised when the daily token/cost ceiling has been reached."""
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def estimate_cost(model: str, prompt_tokens: int = 0, cached_tokens: int = 0,
+                  output_tokens: int = 0, images: int = 0) -> float:
+    """Estimated USD cost of a single model call."""
+    pricing = MODEL_PRICING.get(model, {})
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    cost = (
+        uncached * pricing.get("input", 0)
+        + cached_tokens * pricing.get("cachedInput", 0)
+        + output_tokens * pricing.get("output", 0)
+    ) / 1_000_000
+    cost += images * pricing.get("image", 0)
+    return round(cost, 6)
+
+
+def record_usage(usage: list | None, stage: str, model: str, response, started_at: float) -> dict:
+    """
+    Extract token counts and latency from a model response and append them to `usage`.
+    `started_at` is a time.monotonic() reading taken just before the call.
+    """
+    meta = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(meta, "prompt_token_count", None) or 0
+    cached_tokens = getattr(meta, "cached_content_token_count", None) or 0
+    # Thinking tokens are billed as output and count against max_output_tokens
+    output_tokens = (getattr(meta, "candidates_token_count", None) or 0) + (getattr(meta, "thoughts_token_count", None) or 0)
+    images = len(getattr(response, "generated_images", None) or [])
+
+    finish_reason = None
+    candidates = getattr(response, "candidates", None)
+    if candidates:
+        reason = getattr(candidates[0], "finish_reason", None)
+        finish_reason = getattr(reason, "name", None) or (str(reason) if reason else None)
+
+    entry = {
+        "stage": stage,
+        "model": model,
+        "promptTokens": prompt_tokens,
+        "cachedTokens": cached_tokens,
+        "outputTokens": output_tokens,
+        "images": images,
+        "latencyMs": int((time.monotonic() - started_at) * 1000),
+        "finishReason": finish_reason,
+        "costUsd": estimate_cost(model, prompt_tokens, cached_tokens, output_tokens, images),
+    }
+    if usage is not None:
+        usage.append(entry)
+    logger.info(
+        f"[usage] {stage}: prompt={prompt_tokens} cached={cached_tokens} output={output_tokens} "
+        f"images={images} latency={entry['latencyMs']}ms cost=${entry['costUsd']:.4f}"
+    )
+    return entry
+
+
+def summarize_usage(usage: list[dict]) -> dict:
+    """Aggregate per-call usage entries into run totals plus a per-stage breakdown."""
+    fields = ("promptTokens", "cachedTokens", "outputTokens", "images", "latencyMs", "costUsd")
+    summary = {f: 0 for f in fields}
+    by_stage: dict[str, dict] = {}
+    for entry in usage:
+        stage = by_stage.setdefault(entry["stage"], {f: 0 for f in fields})
+        for f in fields:
+            summary[f] += entry.get(f, 0)
+            stage[f] += entry.get(f, 0)
+    summary["calls"] = len(usage)
+    summary["totalTokens"] = summary["promptTokens"] + summary["outputTokens"]
+    summary["costUsd"] = round(summary["costUsd"], 6)
+    for stage in by_stage.values():
+        stage["costUsd"] = round(stage["costUsd"], 6)
+    summary["byStage"] = by_stage
+    return summary
+
+
+def record_daily_usage(summary: dict) -> None:
+    """Add a run's usage to the per-day totals in blog_usage_daily/{YYYY-MM-DD}."""
+    if not summary.get("calls"):
+        return
+    try:
+        get_db().collection("blog_usage_daily").document(_today()).set({
+            "date": _today(),
+            "runs": firestore.Increment(1),
+            "calls": firestore.Increment(summary["calls"]),
+            "promptTokens": firestore.Increment(summary["promptTokens"]),
+            "cachedTokens": firestore.Increment(summary["cachedTokens"]),
+            "outputTokens": firestore.Increment(summary["outputTokens"]),
+            "totalTokens": firestore.Increment(summary["totalTokens"]),
+            "images": firestore.Increment(summary["images"]),
+            "costUsd": firestore.Increment(summary["costUsd"]),
+            "updatedAt": datetime.now(timezone.utc).isoformat(),
+        }, merge=True)
+    except Exception as e:
+        logger.warning(f"Could not record daily usage (non-fatal): {e}")
+
+
+def check_daily_budget(stage: str, run_usage: list[dict] | None = None) -> None:
+    """
+    Raise BudgetExceededError if today's recorded usage plus the current run's
+    usage so far has reached DAILY_TOKEN_LIMIT or DAILY_COST_LIMIT_USD.
+    Call before starting an expensive stage.
+    """
+    token_limit = int(os.environ.get("DAILY_TOKEN_LIMIT") or 400_000)
+    cost_limit = float(os.environ.get("DAILY_COST_LIMIT_USD") or 2.0)
+    if token_limit <= 0 and cost_limit <= 0:
+        return
+
+    snap = get_db().collection("blog_usage_daily").document(_today()).get()
+    daily = snap.to_dict() if snap.exists else {}
+    current = summarize_usage(run_usage or [])
+    tokens = (daily.get("totalTokens") or 0) + current["totalTokens"]
+    cost = (daily.get("costUsd") or 0) + current["costUsd"]
+
+    if token_limit > 0 and tokens >= token_limit:
+        raise BudgetExceededError(f"Daily token limit reached before {stage}: {tokens}/{token_limit}")
+    if cost_limit > 0 and cost >= cost_limit:
+        raise BudgetExceededError(f"Daily cost limit reached before {stage}: ${cost:.2f}/${cost_limit:.2f}")
+
+
+def get_output_budget(category: str) -> int:
+    """
+    Pick max_output_tokens for a category from the content output of its recent runs.
+    Truncated runs hit the old ceiling, so the headroom lets the budget grow after them.
+    """
+    try:
+        docs = (
+            get_db().collection("blog_generation_log")
+            .where("category", "==", category)
+            .order_by("completedAt", direction=firestore.Query.DESCENDING)
+            .limit(OUTPUT_BUDGET_HISTORY)
+            .get()
+        )
+    except Exception as e:
+        logger.warning(f"Could not load output history for {category!r}: {e}")
+        return DEFAULT_MAX_OUTPUT_TOKENS
+
+    samples = [d.to_dict().get("contentOutputTokens") for d in docs]
+    samples = [s for s in samples if s]
+    if len(samples) < OUTPUT_BUDGET_MIN_SAMPLES:
+        return DEFAULT_MAX_OUTPUT_TOKENS
+
+    budget = math.ceil(max(samples) * OUTPUT_BUDGET_HEADROOM / 1024) * 1024
+    budget = min(max(budget, MIN_MAX_OUTPUT_TOKENS), MAX_MAX_OUTPUT_TOKENS)
+    logger.info(f"Output budget for {category!r}: {budget} tokens ({len(samples)} samples)")
+    return budget
+
+
 # ─── Topic Generation ──────────────────────────────────────────────────────────
 
-def generate_topic_ideas(existing_slugs: list[str], count: int = 10) -> list[dict]:
+def generate_topic_ideas(existing_slugs: list[str], count: int = 10, usage: list | None = None,
+                         queued_topics: list[str] | None = None,
+                         focus_areas: list[str] | None = None) -> list[dict]:
     """Use Gemini to generate SEO-targeted topic ideas Aviniti hasn't covered yet."""
     api_key = (os.environ.get("GEMINI_API_KEY") or "").strip()
     if not api_key:
@@ -93,7 +293,9 @@ def generate_topic_ideas(existing_slugs: list[str], count: int = 10) -> list[dic
     client = genai.Client(api_key=api_key)
     
     existing_list = "\n".join(f"- {s}" for s in existing_slugs) if existing_slugs else "None yet"
+    queued_list = "\n".join(f"- {t}" for t in queued_topics) if queued_topics else "None"
     areas_list = "\n".join(f"- {a}" for a in TOPIC_SEED_AREAS)
+    focus_list = "\n".join(f"- {a}" for a in focus_areas) if focus_areas else "Any"
 
     prompt = f"""You are an SEO content strategist for Aviniti, an AI-powered app development company in Amman, Jordan.
 
@@ -103,9 +305,15 @@ Company context:
 Topic areas to draw from:
 {areas_list}
 
+Under-covered areas to favour in this batch:
+{focus_list}
+
 Already published slugs (DO NOT repeat these topics):
 {existing_list}
 
+Already queued topics (DO NOT repeat these either):
+{queued_list}
+
 Generate exactly {count} new blog post topic ideas that:
 1. Target keywords potential Aviniti clients would search for (high buyer intent)
 2. Are specific to Jordan/MENA market context where relevant
@@ -120,15 +328,18 @@ Return ONLY valid JSON array, no markdown, no explanation:
     "targetKeyword": "main SEO keyword phrase",
     "angle": "specific content angle or hook",
     "category": "App Development|AI|Digital Transformation|Business|Mobile|Web",
+    "seedArea": "the topic area above it belongs to, copied exactly",
     "priority": 1-10
   }}
 ]"""
 
+    started_at = time.monotonic()
     response = client.models.generate_content(
-        model="gemini-3-flash-preview",
+        model=TEXT_MODEL,
         contents=prompt,
         config=types.GenerateContentConfig(temperature=0.7)
     )
+    record_usage(usage, "topics", TEXT_MODEL, response, started_at)
     
     raw = response.text.strip()
     # Strip markdown code blocks if present
@@ -140,43 +351,178 @@ Return ONLY valid JSON array, no markdown, no explanation:
     return ideas
 
 
-def get_or_create_topic(existing_slugs: list[str]) -> dict:
-    """Get next pending topic from backlog, or generate new ones if backlog is low."""
+def _recently_used_topics() -> list[dict]:
+    docs = (
+        get_db().collection("blog_topic_backlog")
+        .where("status", "==", "used")
+        .order_by("usedAt", direction=firestore.Query.DESCENDING)
+        .limit(FAIRNESS_WINDOW)
+        .get()
+    )
+    return [d.to_dict() for d in docs]
+
+
+def _age_days(iso: str | None, now: datetime) -> float:
+    try:
+        return max((now - datetime.fromisoformat(iso)).total_seconds() / 86400, 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def select_next_topic(pending: list[dict], recent: list[dict]) -> dict:
+    """
+    Pick the next topic with a weighted round-robin over categories, then by aged priority.
+
+    Categories are served in proportion to CATEGORY_WEIGHTS over the last FAIRNESS_WINDOW
+    published topics: the category furthest below its share goes next (ties go to the one
+    used longest ago). Within it, a topic's score is its priority, plus TOPIC_AGING_PER_DAY
+    for every day it has waited, minus SEED_AREA_PENALTY per recent use of its seed area.
+    """
+    now = datetime.now(timezone.utc)
+    categories = {t.get("category", "") for t in pending}
+    weights = {c: CATEGORY_WEIGHTS.get(c, 1.0) for c in categories}
+    total_weight = sum(weights.values())
+
+    recent_categories = [t.get("category", "") for t in recent]
+    recent_areas = [t.get("seedArea", "") for t in recent]
+
+    def category_rank(category: str) -> tuple:
+        expected = weights[category] / total_weight * (len(recent) + 1)
+        deficit = expected - recent_categories.count(category)
+        # Position of the last use; never-used categories sort first
+        last_use = recent_categories.index(category) if category in recent_categories else len(recent) + 1
+        return deficit, last_use
+
+    category = max(categories, key=category_rank)
+
+    def topic_score(topic: dict) -> float:
+        score = float(topic.get("priority") or 0)
+        score += TOPIC_AGING_PER_DAY * _age_days(topic.get("createdAt"), now)
+        if topic.get("seedArea"):
+            score -= SEED_AREA_PENALTY * recent_areas.count(topic["seedArea"])
+        return score
+
+    return max((t for t in pending if t.get("category", "") == category), key=topic_score)
+
+
+def get_publish_rate() -> float:
+    """Published posts per day over the last BACKLOG_RATE_WINDOW_DAYS."""
+    cutoff = datetime.fromtimestamp(time.time() - BACKLOG_RATE_WINDOW_DAYS * 86400, timezone.utc).isoformat()
+    recent = (
+        get_db().collection("blog_posts")
+        .where("status", "==", "published")
+        .where("publishedAt", ">=", cutoff)
+        .order_by("publishedAt", direction=firestore.Query.DESCENDING)
+        .select(["slug"])
+        .get()
+    )
+    return len(recent) / BACKLOG_RATE_WINDOW_DAYS
+
+
+def refill_backlog(existing_slugs: list[str], usage: list | None = None, min_count: int = 0) -> int:
+    """
+    Top up blog_topic_backlog so it covers BACKLOG_LEAD_DAYS of publishing at the
+    current rate (at least BACKLOG_MIN_PENDING, or `min_count` ideas when given).
+    Generation is steered towards seed areas that are under-represented in the
+    pending and recently used topics. Returns the number of topics added.
+    """
     backlog_ref = get_db().collection("blog_topic_backlog")
-    
-    # Count pending topics
-    pending = backlog_ref.where("status", "==", "pending").order_by("priority", direction=firestore.Query.DESCENDING).limit(1).get()
-    pending_count = len(backlog_ref.where("status", "==", "pending").limit(10).get())
-    
-    # Refill backlog if running low
-    if pending_count < 5:
-        logger.info(f"Backlog low ({pending_count} topics). Generating new ideas...")
-        new_ideas = generate_topic_ideas(existing_slugs, count=10)
-        batch = get_db().batch()
-        for idea in new_ideas:
-            doc_ref = backlog_ref.document()
-            batch.set(doc_ref, {
-                **idea,
-                "status": "pending",
-                "createdAt": datetime.now(timezone.utc).isoformat(),
-            })
-        batch.commit()
-        logger.info(f"Added {len(new_ideas)} new topics to backlog")
-        
-        # Re-fetch
-        pending = backlog_ref.where("status", "==", "pending").order_by("priority", direction=firestore.Query.DESCENDING).limit(1).get()
-    
+    pending = [d.to_dict() for d in backlog_ref.where("status", "==", "pending").get()]
+    target = max(BACKLOG_MIN_PENDING, math.ceil(get_publish_rate() * BACKLOG_LEAD_DAYS))
+    count = min(max(target - len(pending), min_count), BACKLOG_MAX_REFILL)
+    if count <= 0:
+        logger.info(f"Backlog healthy ({len(pending)} pending, target {target})")
+        return 0
+
+    covered = [t.get("seedArea") for t in pending + _recently_used_topics()]
+    focus_areas = sorted(TOPIC_SEED_AREAS, key=covered.count)[:max(count, 3)]
+
+    logger.info(f"Backlog low ({len(pending)} pending, target {target}). Generating {count} ideas...")
+    check_daily_budget("topic generation", usage)
+    new_ideas = generate_topic_ideas(
+        existing_slugs,
+        count=count,
+        usage=usage,
+        queued_topics=[t.get("topic", "") for t in pending],
+        focus_areas=focus_areas,
+    )
+    batch = get_db().batch()
+    for idea in new_ideas:
+        batch.set(backlog_ref.document(), {
+            **idea,
+            "status": "pending",
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+        })
+    batch.commit()
+    logger.info(f"Added {len(new_ideas)} new topics to backlog")
+    return len(new_ideas)
+
+
+def get_or_create_topic(existing_slugs: list[str], usage: list | None = None, run_id: str | None = None) -> dict:
+    """
+    Select the next pending topic from the backlog (generated inline only if it's empty).
+    With `run_id`, the topic is claimed for that run, or the run's earlier claim is resumed.
+    """
+    backlog_ref = get_db().collection("blog_topic_backlog")
+    if run_id:
+        for doc in backlog_ref.where("claimedBy", "==", run_id).limit(1).get():
+            if doc.to_dict().get("status") != "used":
+                logger.info(f"Resuming topic {doc.id} already claimed by run {run_id}")
+                return {"id": doc.id, "ref": doc.reference, **doc.to_dict()}
+
+    pending = backlog_ref.where("status", "==", "pending").get()
+
+    if not pending:
+        logger.warning("Backlog empty — generating topics inline (is refill_topic_backlog running?)")
+        refill_backlog(existing_slugs, usage=usage, min_count=BACKLOG_MIN_PENDING)
+        pending = backlog_ref.where("status", "==", "pending").get()
+
     if not pending:
         raise RuntimeError("No pending topics available even after generation")
-    
-    doc = pending[0]
-    return {"id": doc.id, "ref": doc.reference, **doc.to_dict()}
+
+    topics = [{"id": doc.id, "ref": doc.reference, **doc.to_dict()} for doc in pending]
+    recent = _recently_used_topics()
+    while topics:
+        topic = select_next_topic(topics, recent)
+        if not run_id or claim_topic(topic["ref"], run_id):
+            return topic
+        logger.info(f"Topic {topic['id']} was claimed by another run, selecting again")
+        topics = [t for t in topics if t["id"] != topic["id"]]
+    raise RuntimeError("All pending topics were claimed by concurrent runs")
 
 
 # ─── Content Generation ────────────────────────────────────────────────────────
 
-def generate_blog_content(topic: dict) -> dict:
-    """Generate full bilingual blog post content using Gemini."""
+def generate_blog_content(topic: dict, usage: list | None = None,
+                          max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS,
+                          previous: dict | None = None,
+                          locales: list[str] | None = None,
+                          source: dict | None = None) -> dict:
+    """
+    Generate the English post with Gemini, then each target locale (default
+    get_target_locales()) from it as a separate concurrent task.
+    Locales that fail are left out and listed in post_data["missingLocales"]
+    (locale → error) so the post can still be published and backfilled later.
+    When regenerating, `previous` is the stored post: its translations are reused
+    if the English is unchanged.
+    With `source` (slug, en, imagePrompt, tags, ... of a stored or re-imported post),
+    Gemini isn't asked for the English; target locales present in `source` are kept as is.
+    """
+    targets = get_target_locales() if locales is None else locales
+    if source is not None:
+        post_data = {k: v for k, v in source.items() if k not in LOCALE_CONFIG}
+        supplied = {loc: source[loc] for loc in targets if source.get(loc)}
+        translations, errors = translate_post_locales(
+            post_data[SOURCE_LOCALE],
+            [loc for loc in targets if loc not in supplied],
+            usage=usage,
+            max_output_tokens=max_output_tokens,
+            previous=previous,
+        )
+        post_data.update({**supplied, **translations})
+        post_data["missingLocales"] = errors
+        return post_data
+
     api_key = (os.environ.get("GEMINI_API_KEY") or "").strip()
     client = genai.Client(api_key=api_key)
     
@@ -210,12 +556,6 @@ Requirements:
 7. Include realistic numbers and specific details relevant to Jordan/MENA market
 8. Use Western numerals (1, 2, 3) not Arabic-Indic
 
-Also provide:
-- An Arabic version of the ENTIRE post (translate + adapt naturally, not just literal translation)
-  - Use Modern Standard Arabic (MSA) with natural Jordanian business context
-  - Arabic CTA links should use the same paths (/get-estimate, etc.)
-  - Arabic version should feel naturally written, not machine-translated
-
 Return ONLY valid JSON (no markdown wrapper):
 {{
   "slug": "{slug}",
@@ -229,23 +569,21 @@ Return ONLY valid JSON (no markdown wrapper):
     "excerpt": "2-3 sentence compelling excerpt for cards and meta",
     "metaDescription": "Under 155 chars SEO meta description with keyword",
     "content": "Full markdown content here..."
-  }},
-  "ar": {{
-    "title": "Arabic title",
-    "excerpt": "Arabic excerpt",
-    "metaDescription": "Arabic meta description",
-    "content": "Full Arabic markdown content..."
   }}
 }}"""
 
+    started_at = time.monotonic()
     response = client.models.generate_content(
-        model="gemini-3-flash-preview",
+        model=TEXT_MODEL,
         contents=prompt,
         config=types.GenerateContentConfig(
             temperature=0.6,
-            max_output_tokens=8192,
+            max_output_tokens=max_output_tokens,
         )
     )
+    entry = record_usage(usage, "content", TEXT_MODEL, response, started_at)
+    if entry["finishReason"] == "MAX_TOKENS":
+        logger.warning(f"Content hit max_output_tokens={max_output_tokens}; output is likely truncated")
     
     raw = response.text.strip()
     raw = re.sub(r'^```(?:json)?\s*', '', raw)
@@ -253,13 +591,537 @@ Return ONLY valid JSON (no markdown wrapper):
     
     post_data = json.loads(raw)
     logger.info(f"Generated content for: {post_data['en']['title']}")
+
+    # Translations run separately so recurring segments can come from the translation memory
+    translation_budget = min(max(entry["outputTokens"] * 2, DEFAULT_MAX_OUTPUT_TOKENS), MAX_MAX_OUTPUT_TOKENS)
+    translations, errors = translate_post_locales(
+        post_data[SOURCE_LOCALE],
+        targets,
+        usage=usage,
+        max_output_tokens=translation_budget,
+        previous=previous,
+    )
+    post_data.update(translations)
+    post_data["missingLocales"] = errors
     return post_data
 
 
+# ─── Translation Memory ────────────────────────────────────────────────────────
+
+# Fixed Arabic terms — must match the site's own copy in messages/ar/*.json
+AR_GLOSSARY = {
+    "Aviniti": "أفينيتي",
+    "Idea Lab": "مختبر الأفكار",
+    "AI Analyzer": "محلل الذكاء الاصطناعي",
+    "Get AI Estimate": "احصل على تقدير مدعوم بالذكاء الاصطناعي",
+    "ROI Calculator": "حاسبة العائد",
+    "Your Ideas, Our Reality": "أفكارك، واقعنا",
+    "Frequently Asked Questions": "الأسئلة الشائعة",
+}
+
+TM_FUZZY_THRESHOLD = 0.85   # similarity for a segment to be offered to the model as a reference
+TM_FUZZY_MIN_LENGTH = 30    # shorter segments are too generic to fuzzy-match
+TM_FUZZY_POOL = 500         # recurring segments loaded for fuzzy matching
+TM_MAX_REFERENCES = 15
+TM_LENGTH_RATIO = (0.5, 2.0)  # allowed translated/source length ratio for an aligned pair
+
+_BLOCK_LINE = re.compile(r'^(#{1,6}\s|[-*+]\s|\d+[.)]\s|\||>)')
+_LITERAL_LINE = re.compile(r'^(-{3,}|\*{3,}|_{3,}|\|?(\s*:?-{3,}:?\s*\|)+\s*(:?-{3,}:?)?\s*)$')
+_LINK_TARGET = re.compile(r'\]\(([^)\s]+)\)')
+
+
+def segment_markdown(content: str) -> tuple[list[str], list]:
+    """
+    Split markdown into translatable segments: each heading, list item and table row,
+    and each paragraph. Returns (segments, skeleton) where the skeleton holds literal
+    lines (blank lines, rules, table separators, code) and segment indexes in order.
+    """
+    segments: list[str] = []
+    skeleton: list = []
+    paragraph: list[str] = []
+    in_code = False
+
+    def flush():
+        if paragraph:
+            skeleton.append(len(segments))
+            segments.append("\n".join(paragraph))
+            paragraph.clear()
+
+    for line in content.split("\n"):
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            flush()
+            in_code = not in_code
+            skeleton.append(line)
+        elif in_code or not stripped or _LITERAL_LINE.match(stripped):
+            flush()
+            skeleton.append(line)
+        elif _BLOCK_LINE.match(stripped):
+            flush()
+            skeleton.append(len(segments))
+            segments.append(line)
+        else:
+            paragraph.append(line)
+    flush()
+    return segments, skeleton
+
+
+def assemble_markdown(skeleton: list, segments: list[str]) -> str:
+    """Inverse of segment_markdown with (translated) segments substituted in."""
+    return "\n".join(segments[item] if isinstance(item, int) else item for item in skeleton)
+
+
+def _normalize_segment(text: str) -> str:
+    return re.sub(r'\s+', ' ', text).strip().casefold()
+
+
+def _segment_key(text: str) -> str:
+    return hashlib.sha1(_normalize_segment(text).encode("utf-8")).hexdigest()
+
+
+def _segment_shape(text: str) -> tuple:
+    """Language-independent signature used to align source and translated segments of the same post."""
+    stripped = text.strip()
+    heading = re.match(r'^(#{1,6})\s', stripped)
+    if heading:
+        kind = f"h{len(heading.group(1))}"
+    elif stripped.startswith("|"):
+        kind = f"tr{stripped.count('|')}"
+    elif re.match(r'^[-*+]\s', stripped):
+        kind = "li"
+    elif re.match(r'^\d+[.)]\s', stripped):
+        kind = "ol"
+    elif stripped.startswith(">"):
+        kind = "quote"
+    else:
+        kind = "p"
+    links = tuple(_LINK_TARGET.findall(stripped))
+    numbers = tuple(re.findall(r'\d+', re.sub(r'\]\([^)]*\)', '', stripped)))
+    return kind, links, numbers
+
+
+def _is_anchor(shape: tuple) -> bool:
+    """Headings and segments with links or multi-digit numbers can be matched across languages on their own."""
+    kind, links, numbers = shape
+    return kind.startswith("h") or bool(links) or any(len(n) >= 2 for n in numbers)
+
+
+def _lengths_match(source: str, target: str) -> bool:
+    low, high = TM_LENGTH_RATIO
+    return low <= len(target.strip()) / max(len(source.strip()), 1) <= high
+
+
+def align_segments(source_content: str, target_content: str) -> list[tuple[str, str]]:
+    """
+    Pair source and translated segments of a published post. Anchor segments (headings,
+    segments with links or multi-digit numbers) are matched on their shape; the plain segments
+    between two matched anchors are only paired when both sides have the same number
+    of them with the same shapes. Every pair must also pass a length-ratio check.
+    Passages that were merged, split or freely adapted are left out.
+    """
+    source_segments, _ = segment_markdown(source_content or "")
+    target_segments, _ = segment_markdown(target_content or "")
+    source_shapes = [_segment_shape(seg) for seg in source_segments]
+    target_shapes = [_segment_shape(seg) for seg in target_segments]
+    source_anchors = [i for i, shape in enumerate(source_shapes) if _is_anchor(shape)]
+    target_anchors = [j for j, shape in enumerate(target_shapes) if _is_anchor(shape)]
+
+    matched = []
+    matcher = difflib.SequenceMatcher(
+        None, [source_shapes[i] for i in source_anchors], [target_shapes[j] for j in target_anchors], autojunk=False,
+    )
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            matched.extend(zip(source_anchors[i1:i2], target_anchors[j1:j2]))
+
+    pairs = []
+    # Blocks bounded by consecutive matched anchors (and the ends of both documents)
+    bounds = [(-1, -1)] + matched + [(len(source_segments), len(target_segments))]
+    for (si, ti), (si_next, ti_next) in zip(bounds, bounds[1:]):
+        if si >= 0:
+            pairs.append((si, ti))
+        source_block = range(si + 1, si_next)
+        target_block = range(ti + 1, ti_next)
+        if len(source_block) == len(target_block) and \
+                all(source_shapes[i] == target_shapes[j] for i, j in zip(source_block, target_block)):
+            pairs.extend(zip(source_block, target_block))
+    return [
+        (source_segments[i], target_segments[j]) for i, j in pairs
+        if _lengths_match(source_segments[i], target_segments[j])
+    ]
+
+
+def update_translation_memory(slug: str, source: dict, target: dict, locale: str = "ar",
+                              verified: bool = True) -> int:
+    """
+    Add the aligned segments of a published post to blog_translation_memory.
+    Each document holds one English segment and its translation per locale.
+    Pairs from posts this pipeline translated segment by segment are `verified` and
+    may be reused verbatim; others (e.g. the bootstrap from older, freely adapted posts)
+    are only offered to the model as references.
+    """
+    pairs = align_segments(source.get("content", ""), target.get("content", ""))
+    tm_ref = get_db().collection("blog_translation_memory")
+    now = datetime.now(timezone.utc).isoformat()
+    for start in range(0, len(pairs), 400):
+        batch = get_db().batch()
+        for source_seg, target_seg in pairs[start:start + 400]:
+            batch.set(tm_ref.document(_segment_key(source_seg)), {
+                SOURCE_LOCALE: source_seg,
+                locale: target_seg,
+                "verified": {locale: verified},
+                "hits": firestore.Increment(1),
+                "lastSlug": slug,
+                "updatedAt": now,
+            }, merge=True)
+        batch.commit()
+    return len(pairs)
+
+
+def ensure_translation_memory() -> None:
+    """Build the translation memory from published posts the first time it's needed."""
+    tm_ref = get_db().collection("blog_translation_memory")
+    if tm_ref.limit(1).get():
+        return
+    posts = get_db().collection("blog_posts").where("status", "==", "published").get()
+    total = 0
+    for doc in posts:
+        data = doc.to_dict()
+        for locale in LOCALE_CONFIG:
+            if data.get(SOURCE_LOCALE) and data.get(locale):
+                total += update_translation_memory(
+                    data.get("slug", doc.id), data[SOURCE_LOCALE], data[locale], locale, verified=False,
+                )
+    logger.info(f"Built translation memory: {total} reference segments from {len(posts)} posts")
+
+
+def lookup_translation_memory(segments: list[str], locale: str = "ar") -> tuple[dict[int, str], dict[int, tuple[str, str]]]:
+    """
+    Returns (exact, fuzzy): exact maps segment index → stored verified translation;
+    fuzzy maps segment index → (similar or unverified source segment, its translation)
+    for the model to reuse.
+    """
+    tm_ref = get_db().collection("blog_translation_memory")
+    keys = {i: _segment_key(seg) for i, seg in enumerate(segments)}
+    found = {}
+    for snap in get_db().get_all([tm_ref.document(k) for k in set(keys.values())]):
+        if snap.exists:
+            found[snap.id] = snap.to_dict()
+
+    exact, fuzzy = {}, {}
+    for i, k in keys.items():
+        entry = found.get(k) or {}
+        if not entry.get(locale):
+            continue
+        if (entry.get("verified") or {}).get(locale):
+            exact[i] = entry[locale]
+        else:
+            fuzzy[i] = (entry[SOURCE_LOCALE], entry[locale])
+
+    pending = [
+        i for i in range(len(segments))
+        if i not in exact and i not in fuzzy and len(segments[i].strip()) >= TM_FUZZY_MIN_LENGTH
+    ]
+    if pending:
+        pool = [d.to_dict() for d in tm_ref.where("hits", ">=", 2).limit(TM_FUZZY_POOL).get()]
+        pool = [entry for entry in pool if entry.get(locale)]
+        for i in pending:
+            norm = _normalize_segment(segments[i])
+            best, best_ratio = None, TM_FUZZY_THRESHOLD
+            for entry in pool:
+                matcher = difflib.SequenceMatcher(None, norm, _normalize_segment(entry.get(SOURCE_LOCALE, "")), autojunk=False)
+                if matcher.real_quick_ratio() < best_ratio or matcher.quick_ratio() < best_ratio:
+                    continue
+                ratio = matcher.ratio()
+                if ratio >= best_ratio:
+                    best, best_ratio = entry, ratio
+            if best:
+                fuzzy[i] = (best[SOURCE_LOCALE], best[locale])
+    return exact, fuzzy
+
+
+def validate_translation(source: dict, translated: dict) -> None:
+    """Raise ValueError if a translated block is incomplete or its links differ from the source."""
+    for field in ("title", "excerpt", "metaDescription", "content"):
+        if not (translated.get(field) or "").strip():
+            raise ValueError(f"Translation has an empty {field}")
+    if sorted(_LINK_TARGET.findall(source["content"])) != sorted(_LINK_TARGET.findall(translated["content"])):
+        raise ValueError("Translation changed the article's link targets")
+
+
+def translate_localized(source: dict, locale: str = "ar", usage: list | None = None,
+                        max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS) -> dict:
+    """
+    Translate an English localized block (title, excerpt, metaDescription, content)
+    into `locale`. Segments already in the translation memory are filled in locally;
+    only the rest is sent to Gemini, with close TM matches and the glossary as references.
+    """
+    config = LOCALE_CONFIG[locale]
+    segments, skeleton = segment_markdown(source["content"])
+    try:
+        exact, fuzzy = lookup_translation_memory(segments, locale)
+    except Exception as e:
+        logger.warning(f"Translation memory unavailable for {locale}, translating everything: {e}")
+        exact, fuzzy = {}, {}
+
+    to_translate = {f"s{i}": seg for i, seg in enumerate(segments) if i not in exact}
+    logger.info(f"Translation memory ({locale}): {len(exact)}/{len(segments)} segments reused, {len(fuzzy)} fuzzy references")
+
+    style = "\n".join(f"- {rule}" for rule in config["style"])
+    glossary = "\n".join(f"- {k} → {v}" for k, v in config["glossary"].items()) or "None"
+    references = "\n\n".join(
+        f"EN: {src}\n{locale.upper()}: {tgt}" for src, tgt in list(fuzzy.values())[:TM_MAX_REFERENCES]
+    ) or "None"
+    payload = {
+        "title": source["title"],
+        "excerpt": source["excerpt"],
+        "metaDescription": source["metaDescription"],
+        "segments": to_translate,
+    }
+
+    api_key = (os.environ.get("GEMINI_API_KEY") or "").strip()
+    client = genai.Client(api_key=api_key)
+
+    prompt = f"""You are a professional {config["name"]} translator and content writer for Aviniti, an AI-powered app development company in Amman, Jordan.
+
+Full English article (for context only):
+{source["content"]}
+
+Translate the JSON below into {config["name"]} (translate + adapt naturally, not just literal translation):
+{style}
+- It should feel naturally written, not machine-translated
+- Keep each segment's markdown (#, -, |, **, links) and keep link paths unchanged (/get-estimate, etc.)
+- Use Western numerals (1, 2, 3)
+- Translate each segment on its own; return every segment id exactly once
+- metaDescription under 155 characters
+
+Required terminology:
+{glossary}
+
+Approved translations of similar segments (reuse their wording where it fits):
+{references}
+
+{json.dumps(payload, ensure_ascii=False, indent=2)}
+
+Return ONLY valid JSON (no markdown wrapper) with the same keys:
+{{"title": "...", "excerpt": "...", "metaDescription": "...", "segments": {{"s0": "...", ...}}}}"""
+
+    started_at = time.monotonic()
+    response = client.models.generate_content(
+        model=TEXT_MODEL,
+        contents=prompt,
+        config=types.GenerateContentConfig(
+            temperature=0.4,
+            max_output_tokens=max_output_tokens,
+        )
+    )
+    record_usage(usage, f"translation_{locale}", TEXT_MODEL, response, started_at)
+
+    raw = response.text.strip()
+    raw = re.sub(r'^```(?:json)?\s*', '', raw)
+    raw = re.sub(r'\s*```$', '', raw)
+    translated = json.loads(raw)
+
+    translated_segments = translated.get("segments") or {}
+    missing = [sid for sid in to_translate if not translated_segments.get(sid)]
+    if missing:
+        raise ValueError(f"Translation is missing {len(missing)} segments: {', '.join(missing[:5])}")
+
+    target_segments = [exact[i] if i in exact else translated_segments[f"s{i}"] for i in range(len(segments))]
+    result = {
+        "title": translated.get("title", ""),
+        "excerpt": translated.get("excerpt", ""),
+        "metaDescription": translated.get("metaDescription", ""),
+        "content": assemble_markdown(skeleton, target_segments),
+    }
+    validate_translation(source, result)
+    return result
+
+
+# ─── Locales ───────────────────────────────────────────────────────────────────
+
+SOURCE_LOCALE = "en"
+
+# Locales that can be generated from the English source. A locale is only
+# generated when listed in BLOG_TARGET_LOCALES. Only add one here once the site
+# routes it (src/lib/i18n/routing.ts): the revalidate route rejects the whole
+# request, including en/ar, if it names a locale the site doesn't serve.
+LOCALE_CONFIG = {
+    "ar": {
+        "name": "Arabic",
+        "style": [
+            "Use Modern Standard Arabic (MSA) with natural Jordanian business context",
+        ],
+        "glossary": AR_GLOSSARY,
+    },
+}
+
+TRANSLATION_ATTEMPTS = 2
+BACKFILL_MAX_POSTS = 5          # posts backfilled per backfill_missing_locales run
+
+
+def get_target_locales() -> list[str]:
+    """Locales translated from English on every post (BLOG_TARGET_LOCALES, default "ar")."""
+    configured = (os.environ.get("BLOG_TARGET_LOCALES") or "ar").split(",")
+    locales = [loc.strip() for loc in configured if loc.strip()]
+    unknown = [loc for loc in locales if loc not in LOCALE_CONFIG]
+    if unknown:
+        logger.warning(f"Ignoring locales without LOCALE_CONFIG: {', '.join(unknown)}")
+    return [loc for loc in locales if loc in LOCALE_CONFIG]
+
+
+def post_locales(post: dict) -> list[str]:
+    """Locales a stored post has content for."""
+    return [loc for loc in [SOURCE_LOCALE, *LOCALE_CONFIG] if post.get(loc)]
+
+
+def _translate_with_retry(source: dict, locale: str, usage: list | None, max_output_tokens: int) -> dict:
+    for attempt in range(1, TRANSLATION_ATTEMPTS + 1):
+        try:
+            return translate_localized(source, locale, usage=usage, max_output_tokens=max_output_tokens)
+        except Exception as e:
+            if attempt == TRANSLATION_ATTEMPTS:
+                raise
+            logger.warning(f"Translation to {locale} failed (attempt {attempt}), retrying: {e}")
+            time.sleep(2 * attempt)
+
+
+def translate_post_locales(source: dict, locales: list[str], usage: list | None = None,
+                           max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS,
+                           previous: dict | None = None) -> tuple[dict, dict]:
+    """
+    Translate the English block into each locale concurrently, each with its own
+    retries and validation. A locale whose stored translation in `previous` was made
+    from identical English is reused. Returns (translations, errors) keyed by locale.
+    """
+    translations: dict[str, dict] = {}
+    errors: dict[str, str] = {}
+    todo = []
+    for locale in locales:
+        if previous and previous.get(locale) and content_hash(previous.get(SOURCE_LOCALE)) == content_hash(source):
+            logger.info(f"English unchanged, keeping the existing {locale} translation")
+            translations[locale] = previous[locale]
+        else:
+            todo.append(locale)
+    if not todo:
+        return translations, errors
+
+    try:
+        ensure_translation_memory()
+    except Exception as e:
+        logger.warning(f"Could not build translation memory: {e}")
+
+    with ThreadPoolExecutor(max_workers=len(todo)) as pool:
+        futures = {
+            pool.submit(_translate_with_retry, source, locale, usage, max_output_tokens): locale
+            for locale in todo
+        }
+        for future in as_completed(futures):
+            locale = futures[future]
+            try:
+                translations[locale] = future.result()
+            except Exception as e:
+                logger.error(f"Translation to {locale} failed: {e}")
+                errors[locale] = str(e)
+    return translations, errors
+
+
+def backfill_post_locales(doc, usage: list | None = None) -> list[str]:
+    """
+    Translate the target locales a published post is missing and add them to it.
+    Returns the locales that were added.
+    """
+    post = doc.to_dict()
+    source = post.get(SOURCE_LOCALE)
+    missing = [loc for loc in get_target_locales() if not post.get(loc)]
+    if not source or not missing:
+        return []
+
+    # ~4 characters per English token; translations need roughly twice that
+    estimate = math.ceil(len(json.dumps(source, ensure_ascii=False)) / 4 * 2 / 1024) * 1024
+    budget = min(max(estimate, DEFAULT_MAX_OUTPUT_TOKENS), MAX_MAX_OUTPUT_TOKENS)
+    translations, errors = translate_post_locales(source, missing, usage=usage, max_output_tokens=budget)
+    if not translations:
+        return []
+
+    slug = post.get("slug", doc.id)
+    hashes = {**(post.get("contentHashes") or {}), **{loc: content_hash(t) for loc, t in translations.items()}}
+    doc.reference.update({
+        **translations,
+        "locales": post_locales({**post, **translations}),
+        "missingLocales": sorted(errors),
+        "contentHashes": hashes,
+        "updatedAt": datetime.now(timezone.utc).isoformat(),
+    })
+    for locale, translated in translations.items():
+        try:
+            update_translation_memory(slug, source, translated, locale)
+        except Exception as tm_err:
+            logger.warning(f"Could not update translation memory (non-fatal): {tm_err}")
+    trigger_revalidation(slug, sorted(translations))
+    logger.info(f"Backfilled {', '.join(sorted(translations))} for {slug}")
+    return sorted(translations)
+
+
+# ─── Content Fingerprints ──────────────────────────────────────────────────────
+
+FINGERPRINT_META_FIELDS = ("tags", "category", "targetKeyword", "readingTime")
+
+
+def content_hash(value) -> str:
+    """Short, stable SHA-256 of a JSON-serializable value."""
+    encoded = json.dumps(value, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def fingerprint_post(post_data: dict) -> dict:
+    """Hashes of the imagePrompt, the shared metadata and each language body, stored as contentHashes."""
+    hashes = {
+        "imagePrompt": content_hash(post_data.get("imagePrompt", "")),
+        "meta": content_hash({f: post_data.get(f) for f in FINGERPRINT_META_FIELDS}),
+    }
+    for locale in [SOURCE_LOCALE, *LOCALE_CONFIG]:
+        if post_data.get(locale):
+            hashes[locale] = content_hash(post_data[locale])
+    return hashes
+
+
+def changed_locales(old_hashes: dict | None, new_hashes: dict, image_changed: bool) -> list[str]:
+    """
+    Locales whose rendered pages differ between two fingerprints. Metadata and the
+    featured image show on every locale's cards and pages, so they invalidate all.
+    """
+    old_hashes = old_hashes or {}
+    # A locale dropped from the post also changes (its pages fall back to English)
+    locales = sorted(k for k in new_hashes.keys() | old_hashes.keys() if k not in ("imagePrompt", "meta"))
+    if image_changed or old_hashes.get("meta") != new_hashes.get("meta"):
+        return locales
+    return [loc for loc in locales if old_hashes.get(loc) != new_hashes.get(loc)]
+
+
 # ─── Image Generation ──────────────────────────────────────────────────────────
 
-def generate_and_upload_image(image_prompt: str, slug: str) -> str | None:
-    """Generate featured image with Imagen 4.0 Ultra and upload to Firebase Storage."""
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _storage_download_url(bucket_name: str, blob_path: str) -> str:
+    # Build the Firebase Storage REST download URL.
+    # This works with Firebase Storage security rules (allow read: if true for /blog/)
+    # without requiring object-level ACLs (which fail on uniform-access buckets).
+    encoded_path = quote(blob_path, safe="")
+    return (
+        f"https://firebasestorage.googleapis.com/v0/b/{bucket_name}"
+        f"/o/{encoded_path}?alt=media"
+    )
+
+
+def generate_and_upload_image(image_prompt: str, slug: str, usage: list | None = None) -> str | None:
+    """
+    Generate featured image with Imagen 4.0 Ultra and upload to Firebase Storage.
+    The object is named after the prompt hash (blog/{slug}-{hash}.webp), so it never
+    changes once uploaded: it is served as immutable, and an existing object for the
+    same prompt is reused without calling Imagen.
+    """
     api_key = (os.environ.get("GEMINI_API_KEY") or "").strip()
     bucket_name = (os.environ.get("STORAGE_BUCKET") or "").strip()
 
@@ -268,6 +1130,13 @@ def generate_and_upload_image(image_prompt: str, slug: str) -> str | None:
         return None
     
     try:
+        bucket = storage.bucket(bucket_name)
+        blob_path = f"blog/{slug}-{content_hash(image_prompt)}.webp"
+        blob = bucket.blob(blob_path)
+        if blob.exists():
+            logger.info(f"Image unchanged, reusing {blob_path}")
+            return _storage_download_url(bucket_name, blob_path)
+
         client = genai.Client(api_key=api_key)
         
         full_prompt = f"""
@@ -283,14 +1152,16 @@ def generate_and_upload_image(image_prompt: str, slug: str) -> str | None:
         - 16:9 aspect ratio
         """
         
+        started_at = time.monotonic()
         response = client.models.generate_images(
-            model='imagen-4.0-ultra-generate-001',
+            model=IMAGE_MODEL,
             prompt=full_prompt,
             config=types.GenerateImagesConfig(
                 number_of_images=1,
                 aspect_ratio="16:9",
             )
         )
+        record_usage(usage, "image", IMAGE_MODEL, response, started_at)
         
         if not response.generated_images:
             logger.error("Imagen returned no images")
@@ -304,19 +1175,10 @@ def generate_and_upload_image(image_prompt: str, slug: str) -> str | None:
         webp_buffer.seek(0)
         
         # Upload to Firebase Storage
-        bucket = storage.bucket(bucket_name)
-        blob_path = f"blog/{slug}.webp"
-        blob = bucket.blob(blob_path)
+        blob.cache_control = IMAGE_CACHE_CONTROL
         blob.upload_from_file(webp_buffer, content_type="image/webp")
 
-        # Build the Firebase Storage REST download URL.
-        # This works with Firebase Storage security rules (allow read: if true for /blog/)
-        # without requiring object-level ACLs (which fail on uniform-access buckets).
-        encoded_path = quote(blob_path, safe="")
-        download_url = (
-            f"https://firebasestorage.googleapis.com/v0/b/{bucket_name}"
-            f"/o/{encoded_path}?alt=media"
-        )
+        download_url = _storage_download_url(bucket_name, blob_path)
         logger.info(f"Image uploaded: {download_url}")
         return download_url
 
@@ -327,8 +1189,8 @@ def generate_and_upload_image(image_prompt: str, slug: str) -> str | None:
 
 # ─── Revalidation ─────────────────────────────────────────────────────────────
 
-def trigger_revalidation(slug: str) -> None:
-    """Notify Next.js to revalidate the blog pages."""
+def trigger_revalidation(slug: str, locales: list[str] | None = None) -> None:
+    """Notify Next.js to revalidate the blog pages (all locales unless `locales` is given)."""
     revalidate_url = (os.environ.get("REVALIDATE_URL") or "").strip()
     revalidate_secret = (os.environ.get("REVALIDATE_SECRET") or "").strip()
     
@@ -339,123 +1201,573 @@ def trigger_revalidation(slug: str) -> None:
     try:
         response = requests.post(
             revalidate_url,
-            json={"secret": revalidate_secret, "slug": slug, "type": "blog"},
+            json={
+                "secret": revalidate_secret,
+                "slug": slug,
+                "type": "blog",
+                **({"locales": locales} if locales else {}),
+            },
             timeout=15,
         )
         if response.status_code == 200:
-            logger.info(f"Revalidation triggered for /blog/{slug}")
+            logger.info(f"Revalidation triggered for /blog/{slug} ({', '.join(locales) if locales else 'all locales'})")
         else:
             logger.warning(f"Revalidation returned {response.status_code}: {response.text}")
     except Exception as e:
         logger.warning(f"Revalidation request failed (non-fatal): {e}")
 
 
-# ─── Main Scheduled Function ───────────────────────────────────────────────────
+# ─── Run & Publish Commit ──────────────────────────────────────────────────────
 
-@scheduler_fn.on_schedule(
-    schedule="0 0 * * *",
-    timezone="Asia/Amman",
-    memory=512,
-    timeout_sec=540,
-    secrets=["GEMINI_API_KEY", "REVALIDATE_SECRET", "REVALIDATE_URL", "STORAGE_BUCKET"],
-)
-def generate_blog_post(event: scheduler_fn.ScheduledEvent) -> None:
+RUN_LEASE_SECONDS = 600          # a "running" log older than this is treated as crashed (> function timeout)
+STALE_CLAIM_HOURS = 6            # a "processing" topic claimed longer ago than this is released
+SLUG_MAX_SUFFIX = 20
+
+
+class TopicAlreadyUsedError(RuntimeError):
+    """Raised when the topic was published by another run before this one committed."""
+
+
+class RunInProgressError(RuntimeError):
+    """Raised when another invocation of the same run still holds its lease."""
+
+
+def start_run(log_ref, fields: dict) -> str:
+    """Take the run's lease and mark its log running. Returns "started", "done" or "busy"."""
+    @firestore.transactional
+    def _start(transaction) -> str:
+        snap = log_ref.get(transaction=transaction)
+        if snap.exists:
+            current = snap.to_dict()
+            if current.get("status") == "success":
+                return "done"
+            started_at = current.get("startedAt")
+            if current.get("status") == "running" and started_at and \
+                    time.time() - datetime.fromisoformat(started_at).timestamp() < RUN_LEASE_SECONDS:
+                return "busy"
+        transaction.set(log_ref, {
+            **fields,
+            "startedAt": datetime.now(timezone.utc).isoformat(),
+            "status": "running",
+            "attempts": firestore.Increment(1),
+        }, merge=True)
+        return "started"
+
+    return _start(get_db().transaction())
+
+
+def claim_topic(topic_ref, run_id: str) -> bool:
+    """Atomically move a pending topic to processing for `run_id`. False if another run got it first."""
+    @firestore.transactional
+    def _claim(transaction) -> bool:
+        topic = topic_ref.get(transaction=transaction).to_dict() or {}
+        if topic.get("status") != "pending" and topic.get("claimedBy") != run_id:
+            return False
+        transaction.update(topic_ref, {
+            "status": "processing",
+            "claimedBy": run_id,
+            "claimedAt": datetime.now(timezone.utc).isoformat(),
+        })
+        return True
+
+    return _claim(get_db().transaction())
+
+
+def release_stale_claims() -> int:
+    """Put topics claimed more than STALE_CLAIM_HOURS ago back to pending. Returns how many."""
+    cutoff = time.time() - STALE_CLAIM_HOURS * 3600
+
+    @firestore.transactional
+    def _release(transaction, topic_ref, claimed_by) -> bool:
+        topic = topic_ref.get(transaction=transaction).to_dict() or {}
+        if topic.get("status") != "processing" or topic.get("claimedBy") != claimed_by:
+            return False
+        transaction.update(topic_ref, {
+            "status": "pending",
+            "claimedBy": firestore.DELETE_FIELD,
+            "claimedAt": firestore.DELETE_FIELD,
+        })
+        return True
+
+    released = 0
+    for doc in get_db().collection("blog_topic_backlog").where("status", "==", "processing").get():
+        topic = doc.to_dict()
+        claimed_at = topic.get("claimedAt")
+        if claimed_at and datetime.fromisoformat(claimed_at).timestamp() > cutoff:
+            continue
+        if _release(get_db().transaction(), doc.reference, topic.get("claimedBy")):
+            logger.info(f"Released stale claim on topic {doc.id} (run {topic.get('claimedBy')})")
+            released += 1
+    return released
+
+
+def commit_publish(run_id: str, post_doc: dict, log_ref, log_update: dict,
+                   topic_ref=None, post_ref=None, taken_slugs: set[str] | None = None) -> dict:
     """
-    Main entry point. Runs every 48 hours to publish a new bilingual blog post.
+    Write the post, its blog_slugs reservation, the topic → used change and the run log in one transaction.
+    Returns {"slug", "postId", "alreadyCommitted"}.
     """
-    run_id = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    log_ref = get_db().collection("blog_generation_log").document(run_id)
-    
-    log_ref.set({
-        "startedAt": datetime.now(timezone.utc).isoformat(),
-        "status": "running",
-    })
+    posts = get_db().collection("blog_posts")
+    slugs = get_db().collection("blog_slugs")
+    is_new = post_ref is None
+    if is_new:
+        post_ref = posts.document(run_id)
+    taken_slugs = taken_slugs or set()
+
+    @firestore.transactional
+    def _commit(transaction) -> dict:
+        # Reads (a transaction must read everything before its first write)
+        existing = post_ref.get(transaction=transaction)
+        if is_new and existing.exists:
+            return {"slug": existing.to_dict().get("slug"), "postId": post_ref.id, "alreadyCommitted": True}
+
+        if topic_ref is not None:
+            topic = topic_ref.get(transaction=transaction).to_dict() or {}
+            if topic.get("status") == "used" and topic.get("usedBy") != run_id:
+                raise TopicAlreadyUsedError(f"Topic {topic_ref.id} was already published by run {topic.get('usedBy')}")
+
+        base = post_doc["slug"]
+        slug = None
+        # A regenerated post keeps its slug; a new post takes the first free suffix
+        for n in range(1, SLUG_MAX_SUFFIX + 1 if is_new else 2):
+            candidate = base if n == 1 else f"{base}-{n}"
+            reservation = slugs.document(candidate).get(transaction=transaction)
+            owner = reservation.to_dict().get("postId") if reservation.exists else None
+            if owner == post_ref.id or (owner is None and (candidate not in taken_slugs or not is_new)):
+                slug = candidate
+                break
+        if slug is None:
+            raise RuntimeError(f"No free slug for {base!r} after {SLUG_MAX_SUFFIX if is_new else 1} attempts")
+
+        # Writes
+        now = datetime.now(timezone.utc).isoformat()
+        doc = {**post_doc, "slug": slug}
+        if is_new:
+            transaction.create(post_ref, doc)
+        else:
+            transaction.update(post_ref, doc)
+        transaction.set(slugs.document(slug), {"postId": post_ref.id, "runId": run_id, "reservedAt": now})
+        if topic_ref is not None:
+            transaction.update(topic_ref, {"status": "used", "usedAt": now, "usedBy": run_id})
+        transaction.update(log_ref, {**log_update, "slug": slug, "postId": post_ref.id})
+        return {"slug": slug, "postId": post_ref.id, "alreadyCommitted": False}
+
+    return _commit(get_db().transaction())
+
+
+def commit_failure(log_ref, log_update: dict, topic_ref=None) -> None:
+    """Record a failed run and release its topic for retry in a single batch write."""
+    batch = get_db().batch()
+    if topic_ref is not None:
+        batch.update(topic_ref, {"status": "failed", "failedAt": datetime.now(timezone.utc).isoformat()})
+    batch.update(log_ref, log_update)
+    batch.commit()
+
+
+# ─── Generation Pipeline ───────────────────────────────────────────────────────
+
+def find_post_by_slug(slug: str):
+    """Return the blog_posts snapshot with this slug, or None."""
+    docs = get_db().collection("blog_posts").where("slug", "==", slug).limit(1).get()
+    return docs[0] if docs else None
+
+
+def topic_from_post(post: dict) -> dict:
+    """Rebuild the generation topic for an existing post (older posts don't store topic/angle)."""
+    en = post.get("en") or {}
+    return {
+        "topic": post.get("topic") or en.get("title", ""),
+        "targetKeyword": post.get("targetKeyword") or en.get("title", ""),
+        "angle": post.get("angle") or en.get("excerpt", ""),
+        "category": post.get("category", "General"),
+    }
+
 
+REGENERATE_SOURCE_FIELDS = ("slug", SOURCE_LOCALE, "imagePrompt", "tags", "category", "targetKeyword", "readingTime")
+REWRITE_PARTS = ("content", "image")
+
+
+def validate_reimport(content) -> str | None:
+    """Return why a re-imported post body is unusable, or None if it's fine."""
+    allowed = {*REGENERATE_SOURCE_FIELDS, *LOCALE_CONFIG} - {"slug"}
+    if not isinstance(content, dict) or set(content) - allowed:
+        return f"Body must be a JSON object with fields from: {', '.join(sorted(allowed))}"
+    for locale in (SOURCE_LOCALE, *LOCALE_CONFIG):
+        if locale not in content:
+            continue
+        block = content[locale]
+        if not isinstance(block, dict) or not all(
+                isinstance(block.get(f), str) and block[f].strip() for f in ("title", "excerpt", "metaDescription", "content")):
+            return f"{locale} needs a non-empty title, excerpt, metaDescription and content"
+    return None
+
+
+def run_blog_generation(run_id: str, log_ref, generated_by: str, regenerate_slug: str | None = None,
+                        rewrite: set[str] | None = None, content: dict | None = None) -> dict:
+    """
+    Shared pipeline for the scheduled and manual triggers: pick a topic (or the post to
+    regenerate), generate content and image, publish, revalidate and log the run.
+    Raises BudgetExceededError when the daily ceiling is reached.
+    """
+    rewrite = rewrite or set()
+    usage: list[dict] = []
+    topic = None
     topic_ref = None
+    committed = None
     try:
+        # 0. A retry of a run that already published or regenerated has nothing left to pay for
+        posts_ref = get_db().collection("blog_posts")
+        done = posts_ref.where("generationRunId", "==", run_id).limit(1).get() or \
+            posts_ref.where("lastRunId", "==", run_id).limit(1).get()
+        if done:
+            post = done[0].to_dict()
+            log_ref.update({
+                "status": "success",
+                "slug": post.get("slug"),
+                "postId": done[0].id,
+                "completedAt": datetime.now(timezone.utc).isoformat(),
+            })
+            logger.info(f"Run {run_id} already published {post.get('slug')}, nothing to do")
+            return {"slug": post.get("slug"), "title": (post.get("en") or {}).get("title", ""), "usage": summarize_usage(usage)}
+
         # 1. Get existing slugs to avoid duplicates
         existing_docs = get_db().collection("blog_posts").select(["slug"]).get()
         existing_slugs = [doc.to_dict().get("slug", "") for doc in existing_docs]
         logger.info(f"Found {len(existing_slugs)} existing posts")
-        
-        # 2. Get next topic from backlog
-        topic = get_or_create_topic(existing_slugs)
-        logger.info(f"Selected topic: {topic['topic']}")
 
-        # Mark topic as processing immediately to prevent duplicate posts on concurrent runs
-        topic_ref = topic["ref"]
-        topic_ref.update({"status": "processing"})
+        # 2. Get next topic from backlog, or the existing post being regenerated
+        existing_post = None
+        previous = {}
+        if regenerate_slug:
+            existing_post = find_post_by_slug(regenerate_slug)
+            if existing_post is None:
+                raise ValueError(f"No post with slug {regenerate_slug!r} to regenerate")
+            previous = existing_post.to_dict()
+            topic = topic_from_post(previous)
+        else:
+            # Check the daily ceiling before claiming a topic, so a skipped run leaves it pending
+            check_daily_budget("content generation", usage)
+            # Claimed atomically, so concurrent runs never get the same topic
+            topic = get_or_create_topic(existing_slugs, usage=usage, run_id=run_id)
+            topic_ref = topic["ref"]
+        logger.info(f"Selected topic: {topic['topic']}")
+        if regenerate_slug:
+            check_daily_budget("content generation", usage)
 
         # Small pause before calling Gemini
         time.sleep(2)
 
-        # 3. Generate bilingual content
-        post_data = generate_blog_content(topic)
+        # 3. Generate content in every target locale
+        max_output_tokens = get_output_budget(topic.get("category", ""))
+        source = None
+        if existing_post is not None:
+            source = {f: previous[f] for f in REGENERATE_SOURCE_FIELDS if previous.get(f) is not None}
+            source.update(content or {})
+            if rewrite:
+                # One Gemini call yields both; keep the stored part that wasn't asked for
+                fresh = generate_blog_content(topic, usage=usage, max_output_tokens=max_output_tokens, locales=[])
+                if "content" in rewrite:
+                    source[SOURCE_LOCALE] = fresh[SOURCE_LOCALE]
+                if "image" in rewrite or not source.get("imagePrompt"):
+                    source["imagePrompt"] = fresh.get("imagePrompt", "")
+        post_data = generate_blog_content(
+            topic, usage=usage, max_output_tokens=max_output_tokens, previous=previous or None, source=source,
+        )
         slug = post_data["slug"]
-        
-        # Check slug uniqueness
-        if slug in existing_slugs:
-            slug = f"{slug}-2"
-        
-        # Small pause before image generation
-        time.sleep(3)
-        
-        # 4. Generate and upload featured image
-        image_url = generate_and_upload_image(post_data.get("imagePrompt", ""), slug)
-        
-        # 5. Save post to Firestore
+
+        # Final slug uniqueness is settled by commit_publish
+        if existing_post is not None:
+            slug = regenerate_slug
+
         post_doc = {
             "slug": slug,
             "status": "published",
             "publishedAt": datetime.now(timezone.utc).isoformat(),
-            "featuredImage": image_url,
+            "featuredImage": None,
             "tags": post_data.get("tags", []),
             "category": post_data.get("category", "General"),
             "targetKeyword": post_data.get("targetKeyword", ""),
             "readingTime": post_data.get("readingTime", 7),
-            "en": post_data["en"],
-            "ar": post_data["ar"],
-            "generatedBy": "cloud_function",
+            "topic": topic.get("topic", ""),
+            "angle": topic.get("angle", ""),
+            **{loc: post_data[loc] for loc in post_locales(post_data)},
+            "locales": post_locales(post_data),
+            "missingLocales": sorted(post_data["missingLocales"]),
+            "imagePrompt": post_data.get("imagePrompt", ""),
+            "generatedBy": generated_by,
             "generationRunId": run_id,
         }
-        
-        get_db().collection("blog_posts").document().set(post_doc)
-        logger.info(f"✅ Published post: {slug}")
-        
-        # 6. Mark topic as used
-        topic["ref"].update({"status": "used", "usedAt": datetime.now(timezone.utc).isoformat()})
-        
-        # 7. Trigger Next.js revalidation
-        trigger_revalidation(slug)
-        
-        # 8. Update log
+        old_hashes = previous.get("contentHashes") or {}
+        hashes = fingerprint_post({**post_doc, "imagePrompt": post_data.get("imagePrompt", "")})
+        post_doc["contentHashes"] = hashes
+
+        # 4. Generate and upload featured image (skipped, not fatal, once over budget)
+        image_url = None
+        if not post_data.get("imagePrompt"):
+            # Posts from before imagePrompt was stored, re-imported without one
+            logger.info("No image prompt, keeping the existing featured image")
+            image_url = previous.get("featuredImage")
+        elif previous.get("featuredImage") and old_hashes.get("imagePrompt") == hashes["imagePrompt"]:
+            logger.info("Image prompt unchanged, keeping the existing featured image")
+            image_url = previous["featuredImage"]
+        else:
+            # Small pause before image generation
+            time.sleep(3)
+            try:
+                check_daily_budget("image generation", usage)
+                image_url = generate_and_upload_image(post_data.get("imagePrompt", ""), slug, usage=usage)
+            except BudgetExceededError as e:
+                logger.warning(f"{e} — publishing without a new featured image")
+            image_url = image_url or previous.get("featuredImage")
+        post_doc["featuredImage"] = image_url
+
+        if existing_post is not None:
+            # Keep the original publish date and provenance on regeneration
+            post_doc.pop("publishedAt")
+            post_doc.pop("generatedBy")
+            post_doc.pop("generationRunId")
+            post_doc["regeneratedBy"] = generated_by
+            post_doc["lastRunId"] = run_id
+            post_doc["updatedAt"] = datetime.now(timezone.utc).isoformat()
+            # A failed locale must not keep a translation of the old English
+            for loc in post_data["missingLocales"]:
+                post_doc[loc] = firestore.DELETE_FIELD
+            locales = changed_locales(old_hashes, hashes, image_url != previous.get("featuredImage"))
+        else:
+            locales = changed_locales(None, hashes, True)
+
+        # 5. Publish: post, slug reservation, topic → used and run log in one transaction
+        summary = summarize_usage(usage)
+        committed = commit_publish(
+            run_id,
+            post_doc,
+            log_ref,
+            {
+                "status": "success",
+                "title": post_data["en"]["title"],
+                "category": topic.get("category", ""),
+                "regenerated": existing_post is not None,
+                "imageGenerated": "image" in summary["byStage"],
+                "revalidatedLocales": locales,
+                "missingLocales": post_data["missingLocales"],
+                "maxOutputTokens": max_output_tokens,
+                "contentOutputTokens": summary["byStage"].get("content", {}).get("outputTokens", 0),
+                "usage": summary,
+                "usageCalls": usage,
+                "completedAt": datetime.now(timezone.utc).isoformat(),
+            },
+            topic_ref=topic_ref,
+            post_ref=existing_post.reference if existing_post is not None else None,
+            taken_slugs=set(existing_slugs),
+        )
+        slug = committed["slug"]
+        if committed["alreadyCommitted"]:
+            logger.info(f"Run {run_id} already published {slug}; nothing new written")
+        else:
+            logger.info(f"✅ {'Regenerated' if existing_post is not None else 'Published'} post: {slug}")
+        record_daily_usage(summary)
+
+        for loc in post_locales(post_data):
+            unchanged = old_hashes.get(loc) == hashes.get(loc) and old_hashes.get(SOURCE_LOCALE) == hashes.get(SOURCE_LOCALE)
+            if loc == SOURCE_LOCALE or unchanged:
+                continue
+            try:
+                update_translation_memory(slug, post_data[SOURCE_LOCALE], post_data[loc], loc)
+            except Exception as tm_err:
+                logger.warning(f"Could not update translation memory (non-fatal): {tm_err}")
+
+        # 6. Trigger Next.js revalidation (only for pages whose content changed)
+        if existing_post is None:
+            trigger_revalidation(slug)
+        elif locales:
+            trigger_revalidation(slug, locales)
+        else:
+            logger.info(f"Content unchanged for {slug}, skipping revalidation")
+
+        logger.info(f"✅ Blog generation complete: {post_data['en']['title']} (${summary['costUsd']:.4f})")
+        return {"slug": slug, "title": post_data["en"]["title"], "usage": summary}
+
+    except Exception as e:
+        if committed is not None:
+            # Post, topic and success log are already committed; only a follow-up step failed
+            logger.error(f"❌ Post-publish step failed for {committed['slug']} (post is live): {e}", exc_info=True)
+            return {"slug": committed["slug"], "title": post_data["en"]["title"], "usage": summarize_usage(usage)}
+        skipped = isinstance(e, BudgetExceededError)
+        if skipped:
+            logger.warning(f"⏸ Blog generation skipped: {e}")
+        else:
+            logger.error(f"❌ Blog generation failed: {e}", exc_info=True)
+        summary = summarize_usage(usage)
+        failure = {
+            "status": "skipped" if skipped else "failed",
+            "error": str(e),
+            "usage": summary,
+            "usageCalls": usage,
+            "completedAt": datetime.now(timezone.utc).isoformat(),
+        }
+        # Keep content output (e.g. truncated JSON) in the budget history for this category
+        if topic is not None and "content" in summary["byStage"]:
+            failure["category"] = topic.get("category", "")
+            failure["contentOutputTokens"] = summary["byStage"]["content"]["outputTokens"]
+        # Mark topic as failed so it can be retried; a topic another run published stays used
+        release = topic_ref if not isinstance(e, TopicAlreadyUsedError) else None
+        try:
+            commit_failure(log_ref, failure, topic_ref=release)
+        except Exception as mark_err:
+            logger.warning(f"Could not record run failure: {mark_err}")
+        record_daily_usage(summary)
+        raise
+
+
+# ─── Main Scheduled Function ───────────────────────────────────────────────────
+
+@scheduler_fn.on_schedule(
+    schedule="0 0 * * *",
+    timezone="Asia/Amman",
+    memory=512,
+    timeout_sec=540,
+    secrets=["GEMINI_API_KEY", "REVALIDATE_SECRET", "REVALIDATE_URL", "STORAGE_BUCKET"],
+    # First retry lands after the run lease expires (timeout 540s + backoff 600s > 600s lease)
+    retry_count=3,
+    min_backoff_seconds=600,
+    max_backoff_seconds=3600,
+)
+def generate_blog_post(event: scheduler_fn.ScheduledEvent) -> None:
+    """
+    Main entry point. Runs every 48 hours to publish a new bilingual blog post.
+    """
+    schedule_time = event.schedule_time
+    if schedule_time.tzinfo is None:
+        # Without an X-CloudScheduler-ScheduleTime header the SDK falls back to a naive utcnow()
+        schedule_time = schedule_time.replace(tzinfo=timezone.utc)
+    run_id = schedule_time.astimezone(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    log_ref = get_db().collection("blog_generation_log").document(run_id)
+
+    state = start_run(log_ref, {"trigger": "scheduled"})
+    if state == "done":
+        logger.info(f"Run {run_id} already completed, skipping")
+        return
+    if state == "busy":
+        raise RunInProgressError(f"Run {run_id} is still in progress; retry after its lease expires")
+
+    try:
+        run_blog_generation(run_id, log_ref, "cloud_function")
+    except BudgetExceededError:
+        # Over the daily ceiling: don't raise, or Cloud Scheduler would retry straight into it
+        return
+
+
+# ─── Backlog Prefetch ──────────────────────────────────────────────────────────
+
+@scheduler_fn.on_schedule(
+    schedule="0 12 * * *",
+    timezone="Asia/Amman",
+    memory=512,
+    timeout_sec=300,
+    secrets=["GEMINI_API_KEY"],
+)
+def refill_topic_backlog(event: scheduler_fn.ScheduledEvent) -> None:
+    """
+    Keeps blog_topic_backlog ahead of demand, off the publishing path.
+    Runs half a day before generate_blog_post so a publish run never waits on topic generation.
+    Also releases topics left "processing" by runs that died and were never retried.
+    """
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S") + "_refill"
+    log_ref = get_db().collection("blog_generation_log").document(run_id)
+    log_ref.set({"startedAt": datetime.now(timezone.utc).isoformat(), "status": "running", "trigger": "refill"})
+
+    usage: list[dict] = []
+    try:
+        existing_docs = get_db().collection("blog_posts").select(["slug"]).get()
+        existing_slugs = [doc.to_dict().get("slug", "") for doc in existing_docs]
+        released = release_stale_claims()
+        added = refill_backlog(existing_slugs, usage=usage)
         log_ref.update({
             "status": "success",
-            "slug": slug,
-            "title": post_data["en"]["title"],
-            "imageGenerated": image_url is not None,
+            "topicsAdded": added,
+            "claimsReleased": released,
+            "usage": summarize_usage(usage),
             "completedAt": datetime.now(timezone.utc).isoformat(),
         })
-        
-        logger.info(f"✅ Blog generation complete: {post_data['en']['title']}")
-        
     except Exception as e:
-        logger.error(f"❌ Blog generation failed: {e}", exc_info=True)
-        # Mark topic as failed so it can be retried
-        if topic_ref is not None:
+        logger.error(f"❌ Backlog refill failed: {e}", exc_info=True)
+        log_ref.update({
+            "status": "skipped" if isinstance(e, BudgetExceededError) else "failed",
+            "error": str(e),
+            "usage": summarize_usage(usage),
+            "completedAt": datetime.now(timezone.utc).isoformat(),
+        })
+    finally:
+        record_daily_usage(summarize_usage(usage))
+
+
+# ─── Locale Backfill ───────────────────────────────────────────────────────────
+
+@scheduler_fn.on_schedule(
+    schedule="0 18 * * *",
+    timezone="Asia/Amman",
+    memory=512,
+    timeout_sec=540,
+    secrets=["GEMINI_API_KEY", "REVALIDATE_SECRET", "REVALIDATE_URL"],
+)
+def backfill_missing_locales(event: scheduler_fn.ScheduledEvent) -> None:
+    """
+    Adds target locales that published posts are missing — locales that failed
+    during generation, or that were added to BLOG_TARGET_LOCALES later.
+    Posts are tried least recently attempted first (lastBackfillAttempt), so posts
+    that keep failing don't take every slot.
+    """
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S") + "_backfill"
+    log_ref = get_db().collection("blog_generation_log").document(run_id)
+    log_ref.set({"startedAt": datetime.now(timezone.utc).isoformat(), "status": "running", "trigger": "backfill"})
+
+    usage: list[dict] = []
+    backfilled: dict[str, list[str]] = {}
+    try:
+        targets = set(get_target_locales())
+        posts = get_db().collection("blog_posts").where("status", "==", "published") \
+            .select(["slug", "locales", "lastBackfillAttempt"]).get()
+        # Posts from before multi-locale support have no "locales" field and are en + ar
+        pending = [d for d in posts if targets - set(d.to_dict().get("locales") or [SOURCE_LOCALE, "ar"])]
+        pending.sort(key=lambda d: d.to_dict().get("lastBackfillAttempt") or "")
+        logger.info(f"{len(pending)} posts missing locales, backfilling up to {BACKFILL_MAX_POSTS}")
+
+        for snap in pending[:BACKFILL_MAX_POSTS]:
+            check_daily_budget("locale backfill", usage)
+            attempt = {"lastBackfillAttempt": datetime.now(timezone.utc).isoformat()}
             try:
-                topic_ref.update({"status": "failed", "failedAt": datetime.now(timezone.utc).isoformat()})
-            except Exception as mark_err:
-                logger.warning(f"Could not mark topic as failed: {mark_err}")
+                added = backfill_post_locales(snap.reference.get(), usage=usage)
+            except BudgetExceededError:
+                raise
+            except Exception as e:
+                logger.error(f"Backfill of {snap.id} failed: {e}")
+                added = []
+                attempt["lastBackfillError"] = str(e)
+            snap.reference.update(attempt)
+            if added:
+                backfilled[snap.to_dict().get("slug", snap.id)] = added
+
+        log_ref.update({
+            "status": "success",
+            "backfilled": backfilled,
+            "remaining": max(len(pending) - len(backfilled), 0),
+            "usage": summarize_usage(usage),
+            "completedAt": datetime.now(timezone.utc).isoformat(),
+        })
+    except Exception as e:
+        logger.error(f"❌ Locale backfill failed: {e}", exc_info=True)
         log_ref.update({
-            "status": "failed",
+            "status": "skipped" if isinstance(e, BudgetExceededError) else "failed",
             "error": str(e),
+            "backfilled": backfilled,
+            "usage": summarize_usage(usage),
             "completedAt": datetime.now(timezone.utc).isoformat(),
         })
-        raise
+    finally:
+        record_daily_usage(summarize_usage(usage))
 
 
-# ─── Manual HTTP Trigger (for initial testing — delete after use) ──────────────
+# ─── Manual HTTP Trigger (publish, regenerate and re-import — keep deployed) ──
 
 @https_fn.on_request(
     memory=512,
@@ -464,50 +1776,57 @@ def generate_blog_post(event: scheduler_fn.ScheduledEvent) -> None:
 )
 def generate_blog_post_manual(req: https_fn.Request) -> https_fn.Response:
     """
-    HTTP trigger for manually firing blog generation.
-    Protect with a secret token in the request header.
-    DELETE THIS FUNCTION after initial testing.
+    HTTP trigger for manually publishing, regenerating and re-importing posts.
+    Protected by a secret token in the request header. This is the only path for
+    regeneration and re-import (seed_blog_post.py --reimport uses it), so keep it deployed.
 
     Usage: curl -X POST https://<region>-aviniti-website.cloudfunctions.net/generate_blog_post_manual \\
            -H "X-Trigger-Secret: <REVALIDATE_SECRET>"
+
+    Add ?regenerate=<slug> to regenerate an existing post in place from its stored
+    English and image prompt; add &rewrite=content,image to have Gemini rewrite them,
+    or POST a JSON body of post fields (en, ar, imagePrompt, tags, ...) to re-import them.
+    Send an Idempotency-Key header to make retries of the same request publish at most once.
     """
     secret = req.headers.get("X-Trigger-Secret", "").strip()
     revalidate_secret = (os.environ.get("REVALIDATE_SECRET") or "").strip()
     if not secret or not revalidate_secret or secret != revalidate_secret:
         return https_fn.Response("Unauthorized", status=401)
 
-    run_id = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S") + "_manual"
+    regenerate_slug = (req.args.get("regenerate") or "").strip() or None
+    if regenerate_slug and not re.fullmatch(r'[a-z0-9\-]+', regenerate_slug):
+        return https_fn.Response("Invalid slug", status=400)
+    rewrite = {part.strip() for part in (req.args.get("rewrite") or "").split(",") if part.strip()}
+    if rewrite - set(REWRITE_PARTS):
+        return https_fn.Response(f"rewrite must be one of {', '.join(REWRITE_PARTS)}", status=400)
+    content = req.get_json(silent=True) if req.content_length else None
+    if content is not None:
+        error = validate_reimport(content)
+        if error:
+            return https_fn.Response(error, status=400)
+    if (rewrite or content) and not regenerate_slug:
+        return https_fn.Response("rewrite and a content body require ?regenerate=<slug>", status=400)
+
+    idempotency_key = req.headers.get("Idempotency-Key", "").strip()
+    if idempotency_key and not re.fullmatch(r'[A-Za-z0-9_\-]{1,64}', idempotency_key):
+        return https_fn.Response("Invalid Idempotency-Key", status=400)
+    if idempotency_key:
+        run_id = f"manual_{idempotency_key}"
+    else:
+        run_id = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S") + f"_manual_{uuid.uuid4().hex[:6]}"
     log_ref = get_db().collection("blog_generation_log").document(run_id)
-    log_ref.set({"startedAt": datetime.now(timezone.utc).isoformat(), "status": "running", "trigger": "manual"})
+    state = start_run(log_ref, {"trigger": "manual"})
+    if state != "started":
+        detail = "already completed" if state == "done" else "still in progress"
+        return https_fn.Response(f"Run {run_id} {detail}", status=409)
 
     try:
-        existing_docs = get_db().collection("blog_posts").select(["slug"]).get()
-        existing_slugs = [doc.to_dict().get("slug", "") for doc in existing_docs]
-        topic = get_or_create_topic(existing_slugs)
-        time.sleep(2)
-        post_data = generate_blog_content(topic)
-        slug = post_data["slug"]
-        if slug in existing_slugs:
-            slug = f"{slug}-2"
-        time.sleep(3)
-        image_url = generate_and_upload_image(post_data.get("imagePrompt", ""), slug)
-        post_doc = {
-            "slug": slug, "status": "published",
-            "publishedAt": datetime.now(timezone.utc).isoformat(),
-            "featuredImage": image_url,
-            "tags": post_data.get("tags", []),
-            "category": post_data.get("category", "General"),
-            "targetKeyword": post_data.get("targetKeyword", ""),
-            "readingTime": post_data.get("readingTime", 7),
-            "en": post_data["en"], "ar": post_data["ar"],
-            "generatedBy": "manual_http_trigger",
-            "generationRunId": run_id,
-        }
-        get_db().collection("blog_posts").document().set(post_doc)
-        topic["ref"].update({"status": "used", "usedAt": datetime.now(timezone.utc).isoformat()})
-        trigger_revalidation(slug)
-        log_ref.update({"status": "success", "slug": slug, "title": post_data["en"]["title"], "completedAt": datetime.now(timezone.utc).isoformat()})
-        return https_fn.Response(f"✅ Published: {slug}", status=200)
+        result = run_blog_generation(
+            run_id, log_ref, "manual_http_trigger", regenerate_slug=regenerate_slug, rewrite=rewrite, content=content,
+        )
+        action = "Regenerated" if regenerate_slug else "Published"
+        return https_fn.Response(f"✅ {action}: {result['slug']}", status=200)
+    except BudgetExceededError as e:
+        return https_fn.Response(f"⏸ Skipped: {str(e)}", status=429)
     except Exception as e:
-        log_ref.update({"status": "failed", "error": str(e), "completedAt": datetime.now(timezone.utc).isoformat()})
         return https_fn.Response(f"❌ Failed: {str(e)}", status=500)
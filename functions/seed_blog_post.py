@@ -6,6 +6,11 @@ Usage:
   pip install firebase-admin --break-system-packages
   python seed_blog_post.py
 
+  # After editing POST below, re-import it into the existing post. Only locales
+  # whose content changed are re-rendered and revalidated:
+  BLOG_MANUAL_TRIGGER_URL=https://<region>-aviniti-website.cloudfunctions.net/generate_blog_post_manual \
+  REVALIDATE_SECRET=<secret> python seed_blog_post.py --reimport
+
 Requires GOOGLE_APPLICATION_CREDENTIALS or firebase-adminsdk JSON in same dir.
 OR set FIREBASE_SERVICE_ACCOUNT_PATH env var.
 """
@@ -13,6 +18,7 @@ OR set FIREBASE_SERVICE_ACCOUNT_PATH env var.
 import os
 import sys
 import json
+import urllib.request
 from datetime import datetime, timezone
 
 import firebase_admin
@@ -291,5 +297,29 @@ def seed():
     print(f"   Slug: {POST['slug']}")
     print(f"   Note: featuredImage is null — update it once the image is generated")
 
+REIMPORT_FIELDS = ("en", "ar", "tags", "category", "targetKeyword", "readingTime")
+
+
+def reimport():
+    """Send POST's content through the generator's regenerate path (see generate_blog_post_manual)."""
+    url = os.environ.get("BLOG_MANUAL_TRIGGER_URL", "").strip()
+    secret = os.environ.get("REVALIDATE_SECRET", "").strip()
+    if not url or not secret:
+        sys.exit("Set BLOG_MANUAL_TRIGGER_URL and REVALIDATE_SECRET to re-import")
+
+    body = json.dumps({f: POST[f] for f in REIMPORT_FIELDS if POST.get(f) is not None}, ensure_ascii=False)
+    request = urllib.request.Request(
+        f"{url}?regenerate={POST['slug']}",
+        data=body.encode("utf-8"),
+        method="POST",
+        headers={"Content-Type": "application/json", "X-Trigger-Secret": secret},
+    )
+    with urllib.request.urlopen(request, timeout=540) as response:
+        print(response.read().decode("utf-8"))
+
+
 if __name__ == "__main__":
-    seed()
+    if "--reimport" in sys.argv:
+        reimport()
+    else:
+        seed()
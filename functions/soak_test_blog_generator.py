@@ -0,0 +1,515 @@
+"""
+Load/soak test for the blog generator under concurrent, overlapping runs.
+
+Fires many concurrent generate_blog_post (scheduled) and generate_blog_post_manual
+(HTTP) invocations against the Firestore emulator, with fake Gemini, Imagen and
+Storage backends, then reports:
+  - invocation outcomes: published, deduplicated (run already done), in progress
+    (lease held by another invocation of the same run), skipped (budget) and failed
+  - duplicate posts (same slug, same backlog topic, or same run published more than once)
+  - duplicate topic claims (one backlog topic picked by more than one run)
+  - run-log collisions (runs sharing a blog_generation_log document)
+  - throughput and latency percentiles
+  - Firestore contention: transaction retries absorbed by the client, and errors that
+    surfaced (Aborted, Conflict, DeadlineExceeded, retries exhausted)
+
+Usage:
+  firebase emulators:start --only firestore
+  export FIRESTORE_EMULATOR_HOST=localhost:8080
+  pip install -r blog_generator/requirements.txt
+  python soak_test_blog_generator.py --runs 200 --concurrency 20
+
+  # Overlapping Cloud Scheduler retries: scheduled calls share 10 schedule times
+  python soak_test_blog_generator.py --runs 200 --concurrency 20 --schedule-pool 10
+
+Refuses to run unless FIRESTORE_EMULATOR_HOST is set. The emulator database is
+wiped before each run (pass --keep-data to skip). Exits with status 1 if any
+duplicate post or duplicate topic claim is found.
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import SimpleNamespace
+
+import requests
+
+if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+    sys.exit("FIRESTORE_EMULATOR_HOST is not set — this script only runs against the Firestore emulator.")
+
+PROJECT_ID = os.environ.setdefault("GCLOUD_PROJECT", "demo-aviniti")
+TRIGGER_SECRET = "soak-test-secret"
+
+# The generator reads these at call time; no real keys or endpoints are used
+os.environ["GEMINI_API_KEY"] = "fake"
+os.environ["REVALIDATE_SECRET"] = TRIGGER_SECRET
+os.environ["STORAGE_BUCKET"] = "soak-test-bucket"
+os.environ.pop("REVALIDATE_URL", None)
+os.environ.setdefault("DAILY_TOKEN_LIMIT", "0")
+os.environ.setdefault("DAILY_COST_LIMIT_USD", "0")
+
+import firebase_admin
+import google.auth.credentials
+from firebase_admin import credentials
+from google.api_core import exceptions as api_exceptions
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "blog_generator"))
+import main  # noqa: E402  (needs the environment above)
+
+# The entry points build their responses with flask.make_response, which needs an app context
+APP = Flask(__name__)
+
+
+# ─── Emulator ──────────────────────────────────────────────────────────────────
+
+class _EmulatorCredential(credentials.Base):
+    def get_credential(self):
+        return google.auth.credentials.AnonymousCredentials()
+
+
+def init_emulator() -> None:
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(_EmulatorCredential(), {"projectId": PROJECT_ID})
+
+
+def reset_emulator() -> None:
+    host = os.environ["FIRESTORE_EMULATOR_HOST"]
+    url = f"http://{host}/emulator/v1/projects/{PROJECT_ID}/databases/(default)/documents"
+    requests.delete(url, timeout=30).raise_for_status()
+
+
+# ─── Fake Backends ─────────────────────────────────────────────────────────────
+
+class FakeModels:
+    """Stands in for genai.Client().models with canned, well-formed responses."""
+
+    def __init__(self, latency: tuple[float, float], error_rate: float):
+        self.latency = latency
+        self.error_rate = error_rate
+
+    def _simulate(self) -> None:
+        time.sleep(random.uniform(*self.latency))
+        if random.random() < self.error_rate:
+            raise RuntimeError("Fake model error (injected)")
+
+    @staticmethod
+    def _response(prompt: str, text: str):
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=len(prompt) // 4,
+                cached_content_token_count=0,
+                candidates_token_count=len(text) // 4,
+                thoughts_token_count=0,
+            ),
+            candidates=[SimpleNamespace(finish_reason=SimpleNamespace(name="STOP"))],
+        )
+
+    def generate_content(self, model: str, contents: str, config=None):
+        self._simulate()
+        prompt = contents
+        if "new blog post topic ideas" in prompt:
+            return self._response(prompt, json.dumps(self._topics(prompt)))
+        if "Translate the JSON below" in prompt:
+            return self._response(prompt, json.dumps(self._translation(prompt), ensure_ascii=False))
+        return self._response(prompt, json.dumps(self._post(prompt)))
+
+    def generate_images(self, model: str, prompt: str, config=None):
+        self._simulate()
+        buffer = io.BytesIO()
+        main.Image.new("RGB", (16, 9), "#0A1628").save(buffer, "PNG")
+        image = SimpleNamespace(image_bytes=buffer.getvalue())
+        return SimpleNamespace(generated_images=[SimpleNamespace(image=image)])
+
+    @staticmethod
+    def _topics(prompt: str) -> list[dict]:
+        count = int(re.search(r"Generate exactly (\d+)", prompt).group(1))
+        categories = list(main.CATEGORY_WEIGHTS)
+        ideas = []
+        for _ in range(count):
+            uid = uuid.uuid4().hex[:8]
+            ideas.append({
+                "topic": f"Soak topic {uid}",
+                "targetKeyword": f"soak keyword {uid}",
+                "angle": "Load test angle",
+                "category": random.choice(categories),
+                "seedArea": random.choice(main.TOPIC_SEED_AREAS),
+                "priority": random.randint(1, 10),
+            })
+        return ideas
+
+    @staticmethod
+    def _post(prompt: str) -> dict:
+        slug = re.search(r'"slug": "([^"]+)"', prompt).group(1)
+        keyword = re.search(r"- Target keyword: (.+)", prompt).group(1)
+        category = re.search(r"- Category: (.+)", prompt).group(1)
+        content = "\n".join([
+            f"# {keyword}",
+            "",
+            f"A load-test article about {keyword}.",
+            "",
+            "## Frequently Asked Questions",
+            "",
+            "- Is this real? No.",
+            "",
+            "Ready to start? [Get your estimate](/get-estimate).",
+        ])
+        return {
+            "slug": slug,
+            "targetKeyword": keyword,
+            "category": category,
+            "readingTime": 5,
+            "tags": ["soak", "test"],
+            "imagePrompt": f"Image for {keyword}",
+            "en": {
+                "title": f"{keyword} guide",
+                "excerpt": "Load test excerpt.",
+                "metaDescription": "Load test meta description.",
+                "content": content,
+            },
+        }
+
+    @staticmethod
+    def _translation(prompt: str) -> dict:
+        locale = re.search(r"Translate the JSON below into (\w+)", prompt).group(1)[:2].lower()
+        start = prompt.index('{\n  "title":')
+        end = prompt.rindex("\n\nReturn ONLY valid JSON")
+        payload = json.loads(prompt[start:end])
+        return {
+            "title": f"[{locale}] {payload['title']}",
+            "excerpt": f"[{locale}] {payload['excerpt']}",
+            "metaDescription": f"[{locale}] {payload['metaDescription']}",
+            "segments": {sid: f"{seg} [{locale}]" for sid, seg in payload["segments"].items()},
+        }
+
+
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", path: str):
+        self.bucket = bucket
+        self.path = path
+        self.cache_control = None
+
+    def exists(self) -> bool:
+        with self.bucket.lock:
+            return self.path in self.bucket.objects
+
+    def upload_from_file(self, file_obj, content_type: str | None = None) -> None:
+        with self.bucket.lock:
+            self.bucket.objects[self.path] = file_obj.read()
+            self.bucket.uploads += 1
+
+
+class FakeBucket:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.objects: dict[str, bytes] = {}
+        self.uploads = 0
+
+    def blob(self, path: str) -> FakeBlob:
+        return FakeBlob(self, path)
+
+
+# ─── Instrumentation ───────────────────────────────────────────────────────────
+
+class Recorder:
+    """Collects per-invocation outcomes from the patched pipeline."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.claims: list[str] = []
+        self.run_ids: list[str] = []
+        self.errors: list[str] = []
+        self.transactions: Counter = Counter()   # transactional calls per function
+        self.attempts: Counter = Counter()       # attempts per function, including retries
+        self.contention: list[str] = []
+        self._seen_contention: set[int] = set()
+
+    def record_contention(self, where: str, error: Exception) -> None:
+        if not is_contention(error) or id(error) in self._seen_contention:
+            return
+        with self.lock:
+            self._seen_contention.add(id(error))
+            self.contention.append(f"{where}: {type(error).__name__}: {error}")
+
+    def reset_invocation(self) -> None:
+        """Clear what the current thread's invocation did (see classify)."""
+        self.local.published = False
+        self.local.error = None
+
+    def install(self) -> None:
+        claim_topic = main.claim_topic
+        commit_publish = main.commit_publish
+        run_blog_generation = main.run_blog_generation
+        transactional = main.firestore.transactional
+
+        def counted_transactional(fn):
+            name = fn.__qualname__.split(".")[0]   # e.g. "commit_publish" for its inner _commit
+
+            def attempt(*args, **kwargs):
+                with self.lock:
+                    self.attempts[name] += 1
+                return fn(*args, **kwargs)
+
+            wrapped = transactional(attempt)
+
+            def call(*args, **kwargs):
+                with self.lock:
+                    self.transactions[name] += 1
+                try:
+                    return wrapped(*args, **kwargs)
+                except Exception as e:
+                    self.record_contention(name, e)
+                    raise
+
+            return call
+
+        def recorded_claim_topic(topic_ref, run_id):
+            claimed = claim_topic(topic_ref, run_id)
+            if claimed:
+                with self.lock:
+                    self.claims.append(topic_ref.id)
+            return claimed
+
+        def recorded_commit_publish(*args, **kwargs):
+            result = commit_publish(*args, **kwargs)
+            self.local.published = not result["alreadyCommitted"]
+            return result
+
+        def recorded_run_blog_generation(run_id, *args, **kwargs):
+            with self.lock:
+                self.run_ids.append(run_id)
+            try:
+                return run_blog_generation(run_id, *args, **kwargs)
+            except Exception as e:
+                self.record_contention("run_blog_generation", e)
+                self.local.error = f"{type(e).__name__}: {e}"
+                with self.lock:
+                    self.errors.append(self.local.error)
+                raise
+
+        main.firestore.transactional = counted_transactional
+        main.claim_topic = recorded_claim_topic
+        main.commit_publish = recorded_commit_publish
+        main.run_blog_generation = recorded_run_blog_generation
+
+
+_CONTENTION_ERRORS = (api_exceptions.Aborted, api_exceptions.Conflict, api_exceptions.DeadlineExceeded)
+
+
+def is_contention(error: Exception) -> bool:
+    """Firestore lock/transaction contention, including a transaction that ran out of retries."""
+    if isinstance(error, _CONTENTION_ERRORS):
+        return True
+    return isinstance(error, ValueError) and str(error).startswith("Failed to commit transaction")
+
+
+def install_fakes(latency: tuple[float, float], error_rate: float, sleep_scale: float) -> FakeBucket:
+    models = FakeModels(latency, error_rate)
+    bucket = FakeBucket()
+    main.genai = SimpleNamespace(Client=lambda api_key=None: SimpleNamespace(models=models))
+    main.storage = SimpleNamespace(bucket=lambda name=None: bucket)
+    # Scale the pipeline's fixed pauses (time.sleep(2)/(3)) without touching the harness
+    main.time = SimpleNamespace(
+        sleep=lambda seconds: time.sleep(seconds * sleep_scale),
+        monotonic=time.monotonic,
+        time=time.time,
+    )
+    return bucket
+
+
+# ─── Load ──────────────────────────────────────────────────────────────────────
+
+def seed_backlog(count: int) -> None:
+    backlog_ref = main.get_db().collection("blog_topic_backlog")
+    batch = main.get_db().batch()
+    for idea in FakeModels._topics(f"Generate exactly {count}"):
+        batch.set(backlog_ref.document(), {**idea, "status": "pending", "createdAt": datetime.now(timezone.utc).isoformat()})
+    batch.commit()
+
+
+def schedule_times(pool: int) -> Callable[[], str]:
+    """
+    Returns a picker of X-CloudScheduler-ScheduleTime values. With a pool, scheduled calls
+    share `pool` schedule times 48 hours apart, i.e. they are overlapping retries of the same
+    executions; without one, every scheduled call is its own execution.
+    """
+    base = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    counter = iter(range(10**9))
+    lock = threading.Lock()
+
+    def pick() -> str:
+        if pool:
+            offset = timedelta(hours=48 * random.randrange(pool))
+        else:
+            with lock:
+                offset = timedelta(minutes=next(counter))
+        return (base + offset).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    return pick
+
+
+def classify(status, detail: str, recorder: Recorder) -> str:
+    """Outcome of one invocation: published, deduplicated, in_progress, skipped or failed."""
+    if recorder.local.published:
+        return "published"
+    error = recorder.local.error or ""
+    if status == 429 or "BudgetExceededError" in error:
+        return "skipped"
+    # Manual: 409 "... still in progress"; scheduled: RunInProgressError becomes a 500 with its message
+    if status in (409, 500) and "still in progress" in detail:
+        return "in_progress"
+    if status == 409:
+        return "deduplicated"
+    if status == 200 and not error:
+        # The lease said the run was done, or the run found its post already published
+        return "deduplicated"
+    return "failed"
+
+
+def invoke(kind: str, recorder: Recorder, schedule_time: Callable[[], str]) -> dict:
+    """Call one entry point the way Cloud Functions would; returns outcome + latency."""
+    recorder.reset_invocation()
+    started = time.monotonic()
+    status, detail = None, ""
+    if kind == "manual":
+        headers = {"X-Trigger-Secret": TRIGGER_SECRET}
+        entry_point = main.generate_blog_post_manual
+    else:
+        headers = {"X-CloudScheduler-JobName": "soak-test", "X-CloudScheduler-ScheduleTime": schedule_time()}
+        entry_point = main.generate_blog_post
+    try:
+        with APP.test_request_context(method="POST", headers=headers) as ctx:
+            response = entry_point(ctx.request)
+        status = response.status_code
+        detail = response.get_data(as_text=True)
+    except Exception as e:
+        status, detail = "exception", f"{type(e).__name__}: {e}"
+    return {
+        "kind": kind,
+        "status": status,
+        "outcome": classify(status, detail, recorder),
+        "detail": detail,
+        "latency": time.monotonic() - started,
+    }
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def collect_report(results: list[dict], recorder: Recorder, bucket: FakeBucket, wall: float) -> dict:
+    posts = [d.to_dict() for d in main.get_db().collection("blog_posts").get()]
+    slug_counts = Counter(p.get("slug") for p in posts)
+    run_counts = Counter(p.get("generationRunId") for p in posts)
+    topic_counts = Counter(p.get("topic") for p in posts if p.get("topic"))
+    claim_counts = Counter(recorder.claims)
+    run_id_counts = Counter(recorder.run_ids)
+    latencies = [r["latency"] for r in results]
+    published = [r["latency"] for r in results if r["outcome"] == "published"]
+    transactions = {
+        name: {"calls": calls, "attempts": recorder.attempts[name], "retries": recorder.attempts[name] - calls}
+        for name, calls in sorted(recorder.transactions.items())
+    }
+
+    return {
+        "invocations": Counter(r["kind"] for r in results),
+        "statuses": Counter(str(r["status"]) for r in results),
+        "outcomes": Counter(r["outcome"] for r in results),
+        "postsCreated": len(posts),
+        "duplicatePostsBySlug": sum(n - 1 for n in slug_counts.values() if n > 1),
+        "duplicatePostsByTopic": sum(n - 1 for n in topic_counts.values() if n > 1),
+        "duplicatePostsByRun": sum(n - 1 for n in run_counts.values() if n > 1),
+        "duplicateTopicClaims": sum(n - 1 for n in claim_counts.values() if n > 1),
+        "runLogCollisions": sum(n - 1 for n in run_id_counts.values() if n > 1),
+        "imageUploads": bucket.uploads,
+        "failedRuns": len(recorder.errors),
+        "transactions": transactions,
+        "transactionRetries": sum(t["retries"] for t in transactions.values()),
+        "contentionErrors": len(recorder.contention),
+        "contentionSamples": recorder.contention[:5],
+        "errorSamples": list(Counter(recorder.errors).most_common(5)),
+        "wallSeconds": round(wall, 2),
+        "throughputPostsPerMin": round(len(posts) / wall * 60, 2) if wall else 0.0,
+        "latencySeconds": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies, default=0.0), 3),
+        },
+        "publishedLatencySeconds": {
+            "p50": round(percentile(published, 50), 3),
+            "p95": round(percentile(published, 95), 3),
+            "p99": round(percentile(published, 99), 3),
+        },
+    }
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=100, help="total invocations")
+    parser.add_argument("--concurrency", type=int, default=10, help="invocations in flight at once")
+    parser.add_argument("--manual-ratio", type=float, default=0.3, help="share of invocations via the HTTP trigger")
+    parser.add_argument("--schedule-pool", type=int, default=0,
+                        help="scheduled calls share this many schedule times, so they overlap as retries (0 = all distinct)")
+    parser.add_argument("--topics", type=int, default=20, help="pending topics seeded (0 = start with an empty backlog)")
+    parser.add_argument("--model-latency", type=float, nargs=2, default=(0.05, 0.4), metavar=("MIN", "MAX"),
+                        help="fake model latency range in seconds")
+    parser.add_argument("--model-error-rate", type=float, default=0.0, help="share of fake model calls that fail")
+    parser.add_argument("--sleep-scale", type=float, default=0.0, help="multiplier for the pipeline's fixed pauses")
+    parser.add_argument("--keep-data", action="store_true", help="don't wipe the emulator first")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the generator's INFO logging")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        main.logger.setLevel("WARNING")
+
+    init_emulator()
+    if not args.keep_data:
+        reset_emulator()
+    bucket = install_fakes(tuple(args.model_latency), args.model_error_rate, args.sleep_scale)
+    recorder = Recorder()
+    recorder.install()
+    if args.topics:
+        seed_backlog(args.topics)
+
+    kinds = ["manual" if random.random() < args.manual_ratio else "scheduled" for _ in range(args.runs)]
+    print(f"Firing {args.runs} invocations ({kinds.count('manual')} manual) with concurrency {args.concurrency}...")
+
+    schedule_time = schedule_times(args.schedule_pool)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(invoke, kind, recorder, schedule_time) for kind in kinds]
+        results = [f.result() for f in as_completed(futures)]
+    wall = time.monotonic() - started
+
+    report = collect_report(results, recorder, bucket, wall)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    failed = report["duplicatePostsBySlug"] or report["duplicatePostsByTopic"] or \
+        report["duplicatePostsByRun"] or report["duplicateTopicClaims"]
+    print("❌ Duplicates found" if failed else "✅ No duplicates")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,8 @@
+"""Tests for the blog generator's pure helpers (no Firestore or model calls)."""
+
+import main
+
+
+def test_module_imports_with_all_entry_points():
+    for name in ("generate_blog_post", "refill_topic_backlog", "backfill_missing_locales", "generate_blog_post_manual"):
+        assert callable(getattr(main, name))
@@ -0,0 +1,54 @@
+"""Weighted round-robin topic selection."""
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import main
+
+
+def _topic(category, priority=5, seed_area="", age_days=0):
+    created = (datetime.now(timezone.utc) - timedelta(days=age_days)).isoformat()
+    return {"category": category, "priority": priority, "seedArea": seed_area, "createdAt": created, "topic": f"{category} {priority}"}
+
+
+def test_never_used_category_goes_first():
+    pending = [_topic("Business"), _topic("Web")]
+    recent = [{"category": "Business"}]
+    assert main.select_next_topic(pending, recent)["category"] == "Web"
+
+
+def test_rotation_follows_category_weights():
+    categories = ["App Development", "AI", "Business", "Web"]
+    recent: list[dict] = []
+    picks = []
+    for _ in range(50):
+        topic = main.select_next_topic([_topic(c) for c in categories], recent)
+        picks.append(topic["category"])
+        recent = [topic, *recent][:main.FAIRNESS_WINDOW]
+
+    window = Counter(picks[-main.FAIRNESS_WINDOW:])
+    total_weight = sum(main.CATEGORY_WEIGHTS[c] for c in categories)
+    for category in categories:
+        share = main.CATEGORY_WEIGHTS[category] / total_weight * main.FAIRNESS_WINDOW
+        assert abs(window[category] - share) <= 1, (category, window)
+    assert window["App Development"] > window["Business"]
+
+
+def test_unknown_category_gets_default_weight():
+    pending = [_topic("Business"), _topic("Something New")]
+    recent = [{"category": "Business"}, {"category": "Something New"}]
+    picks = set()
+    for _ in range(2):
+        topic = main.select_next_topic(pending, recent)
+        picks.add(topic["category"])
+        recent = [topic, *recent]
+    assert picks == {"Business", "Something New"}
+
+
+def test_within_category_priority_ages_and_seed_area_is_penalized():
+    fresh = _topic("AI", priority=6, seed_area="chatbots")
+    waiting = _topic("AI", priority=5, age_days=8)              # 5 + 8 * 0.25 = 7
+    assert main.select_next_topic([fresh, waiting], [])["topic"] == waiting["topic"]
+
+    recent = [{"category": "Web", "seedArea": "chatbots"}]
+    assert main.select_next_topic([fresh, _topic("AI", priority=5, seed_area="fintech")], recent)["seedArea"] == "fintech"
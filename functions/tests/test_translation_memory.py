@@ -0,0 +1,127 @@
+"""Segmentation, alignment and lookup for the translation memory."""
+
+from types import SimpleNamespace
+
+import pytest
+
+import main
+
+ARTICLE = """# Building an App in Jordan
+
+Most agencies won't quote without a discovery call.
+
+## Costs in 2025
+
+| Type | Price |
+|------|-------|
+| MVP | 3000 JOD |
+
+- Login and profiles
+- Payments via [Stripe](/get-estimate)
+
+```
+code stays literal
+```
+
+---
+
+See the [estimator](/get-estimate) for your own idea."""
+
+
+def test_segment_assemble_round_trip():
+    segments, skeleton = main.segment_markdown(ARTICLE)
+    assert main.assemble_markdown(skeleton, segments) == ARTICLE
+
+
+def test_literal_lines_are_not_segments():
+    segments, _ = main.segment_markdown(ARTICLE)
+    assert "code stays literal" not in segments
+    assert "---" not in segments
+    assert "|------|-------|" not in segments
+    assert "| MVP | 3000 JOD |" in segments
+    assert "- Login and profiles" in segments
+
+
+def test_assemble_substitutes_translated_segments():
+    segments, skeleton = main.segment_markdown("# Title\n\nBody text.")
+    assert main.assemble_markdown(skeleton, ["# عنوان", "نص."]) == "# عنوان\n\nنص."
+
+
+def test_align_pairs_identical_structure():
+    source = "# Title\n\nFirst paragraph here.\n\nSecond paragraph here."
+    target = "# عنوان\n\nالفقرة الأولى هنا.\n\nالفقرة الثانية هنا."
+    assert main.align_segments(source, target) == [
+        ("# Title", "# عنوان"),
+        ("First paragraph here.", "الفقرة الأولى هنا."),
+        ("Second paragraph here.", "الفقرة الثانية هنا."),
+    ]
+
+
+def test_align_drops_block_with_merged_paragraphs():
+    source = "# Title\n\nPara one.\n\nPara two.\n\nPara three.\n\n## Costs 2025\n\nClosing words."
+    target = "# عنوان\n\nفقرة أولى.\n\nفقرتان مدمجتان.\n\n## التكاليف 2025\n\nكلمات ختامية."
+    pairs = main.align_segments(source, target)
+    assert ("# Title", "# عنوان") in pairs
+    assert ("## Costs 2025", "## التكاليف 2025") in pairs
+    assert ("Closing words.", "كلمات ختامية.") in pairs
+    assert not any(src.startswith("Para") for src, _ in pairs)
+
+
+def test_align_without_anchors_requires_equal_counts():
+    assert main.align_segments("p1\n\np2\n\np3\n\np4", "a1\n\na2\n\na3") == []
+    assert main.align_segments("pa\n\npb", "aa\n\nab") == [("pa", "aa"), ("pb", "ab")]
+
+
+def test_align_rejects_pairs_with_implausible_length():
+    source = "# Title\n\nA reasonably long English paragraph about app costs."
+    target = "# عنوان\n\nقصير"
+    assert main.align_segments(source, target) == [("# Title", "# عنوان")]
+
+
+class _FakeTM:
+    """blog_translation_memory with just the calls lookup_translation_memory makes."""
+
+    def __init__(self, entries: list[dict]):
+        self.docs = {main._segment_key(e["en"]): e for e in entries}
+
+    def collection(self, name):
+        return self
+
+    def document(self, key):
+        return SimpleNamespace(id=key)
+
+    def get_all(self, refs):
+        return [SimpleNamespace(id=r.id, exists=r.id in self.docs, to_dict=lambda k=r.id: self.docs[k]) for r in refs]
+
+    def where(self, field, op, value):
+        return SimpleNamespace(limit=lambda n: SimpleNamespace(get=lambda: [
+            SimpleNamespace(to_dict=lambda e=e: e) for e in self.docs.values() if e.get(field, 0) >= value
+        ]))
+
+
+@pytest.fixture
+def tm(monkeypatch):
+    def install(entries):
+        fake = _FakeTM(entries)
+        monkeypatch.setattr(main, "get_db", lambda: fake)
+    return install
+
+
+def test_lookup_fills_only_verified_entries(tm):
+    tm([
+        {"en": "## Frequently Asked Questions", "ar": "## الأسئلة الشائعة", "verified": {"ar": True}, "hits": 3},
+        {"en": "## Costs", "ar": "## التكاليف", "hits": 1},
+    ])
+    exact, fuzzy = main.lookup_translation_memory(["## Frequently Asked Questions", "## Costs", "## New"], "ar")
+    assert exact == {0: "## الأسئلة الشائعة"}
+    assert fuzzy == {1: ("## Costs", "## التكاليف")}
+
+
+def test_lookup_offers_close_recurring_segments_as_references(tm):
+    stored = "Ready to see what your app would cost? Get an instant AI estimate today."
+    tm([{"en": stored, "ar": "جاهز؟", "verified": {"ar": True}, "hits": 2}])
+    exact, fuzzy = main.lookup_translation_memory(
+        ["Ready to see what your app would cost? Get an instant AI estimate now."], "ar",
+    )
+    assert exact == {}
+    assert fuzzy == {0: (stored, "جاهز؟")}
@@ -0,0 +1,77 @@
+"""Usage aggregation, cost estimates and the adaptive output budget."""
+
+from types import SimpleNamespace
+
+import pytest
+
+import main
+
+
+def _entry(stage, model=main.TEXT_MODEL, prompt=0, cached=0, output=0, images=0, latency=0):
+    return {
+        "stage": stage, "model": model, "promptTokens": prompt, "cachedTokens": cached,
+        "outputTokens": output, "images": images, "latencyMs": latency,
+        "costUsd": main.estimate_cost(model, prompt, cached, output, images),
+    }
+
+
+def test_estimate_cost_bills_cached_tokens_at_cached_rate():
+    assert main.estimate_cost(main.TEXT_MODEL, prompt_tokens=1_000_000, cached_tokens=400_000) == pytest.approx(0.6 * 0.50 + 0.4 * 0.05)
+    assert main.estimate_cost(main.IMAGE_MODEL, images=2) == pytest.approx(0.12)
+    assert main.estimate_cost("unknown-model", prompt_tokens=10_000, output_tokens=10_000) == 0
+
+
+def test_summarize_usage_totals_and_stages():
+    usage = [
+        _entry("content", prompt=1000, output=6000, latency=40_000),
+        _entry("translation_ar", prompt=3000, cached=1000, output=5000, latency=30_000),
+        _entry("content", prompt=500, output=100, latency=1_000),
+        _entry("image", model=main.IMAGE_MODEL, images=1, latency=9_000),
+    ]
+    summary = main.summarize_usage(usage)
+    assert summary["calls"] == 4
+    assert summary["promptTokens"] == 4500
+    assert summary["outputTokens"] == 11100
+    assert summary["totalTokens"] == 15600
+    assert summary["images"] == 1
+    assert summary["latencyMs"] == 80_000
+    assert summary["byStage"]["content"]["outputTokens"] == 6100
+    assert summary["byStage"]["translation_ar"]["cachedTokens"] == 1000
+    assert summary["costUsd"] == pytest.approx(sum(e["costUsd"] for e in usage))
+
+
+def test_summarize_empty_usage():
+    summary = main.summarize_usage([])
+    assert summary["calls"] == 0 and summary["costUsd"] == 0 and summary["byStage"] == {}
+
+
+@pytest.fixture
+def output_history(monkeypatch):
+    """Make get_output_budget see these contentOutputTokens values for every category."""
+    def install(samples):
+        docs = [SimpleNamespace(to_dict=lambda s=s: {"contentOutputTokens": s}) for s in samples]
+        query = SimpleNamespace()
+        query.where = query.order_by = query.limit = lambda *a, **k: query
+        query.get = lambda: docs
+        monkeypatch.setattr(main, "get_db", lambda: SimpleNamespace(collection=lambda name: query))
+    return install
+
+
+@pytest.mark.parametrize("samples, expected", [
+    ([], main.DEFAULT_MAX_OUTPUT_TOKENS),                        # no history
+    ([6000, 7000], main.DEFAULT_MAX_OUTPUT_TOKENS),              # below OUTPUT_BUDGET_MIN_SAMPLES
+    ([0, None, 6000, 6500], main.DEFAULT_MAX_OUTPUT_TOKENS),     # empty samples don't count
+    ([5000, 6000, 6100], 8192),                                  # 6100 * 1.3 rounded up to 1 KiB
+    ([1000, 1200, 900], main.MIN_MAX_OUTPUT_TOKENS),             # clamped up
+    ([30000, 31000, 32768], main.MAX_MAX_OUTPUT_TOKENS),         # clamped down
+])
+def test_output_budget_clamping(output_history, samples, expected):
+    output_history(samples)
+    assert main.get_output_budget("AI") == expected
+
+
+def test_output_budget_falls_back_when_history_is_unavailable(monkeypatch):
+    def broken():
+        raise RuntimeError("no index")
+    monkeypatch.setattr(main, "get_db", lambda: SimpleNamespace(collection=lambda name: broken()))
+    assert main.get_output_budget("AI") == main.DEFAULT_MAX_OUTPUT_TOKENS
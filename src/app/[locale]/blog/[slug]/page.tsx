@@ -9,7 +9,7 @@ import { Breadcrumbs } from '@/components/layout/Breadcrumbs';
 import { Link } from '@/lib/i18n/navigation';
 import { BlogPostContent } from '@/components/blog/BlogPostContent';
 import { ShareButtons } from '@/components/shared/ShareButtons';
-import { getBlogPost, getAllBlogSlugs } from '@/lib/firebase/blog';
+import { getBlogPost, getAllBlogSlugs, getLocalizedContent } from '@/lib/firebase/blog';
 import { getAlternateLinks } from '@/lib/i18n/config';
 import { getBlogPostingSchema } from '@/components/seo/structured-data';
 import { HERO_BLUR_URL } from '@/lib/utils/image';
@@ -38,7 +38,7 @@ export async function generateMetadata({ params }: Props): Promise<Metadata> {
   const post = await getBlogPost(slug);
   if (!post) return { title: 'Post Not Found' };
 
-  const localeData = locale === 'ar' ? post.ar : post.en;
+  const localeData = getLocalizedContent(post, locale);
   const ogImageUrl = post.featuredImage
     ? post.featuredImage
     : `/api/og?title=${encodeURIComponent(localeData.title)}&description=${encodeURIComponent(localeData.metaDescription ?? localeData.excerpt ?? '')}&type=blog&locale=${locale}`;
@@ -79,7 +79,7 @@ export default async function BlogPostPage({ params }: Props) {
 
   if (!post) notFound();
 
-  const localeData = locale === 'ar' ? post.ar : post.en;
+  const localeData = getLocalizedContent(post, locale);
   const format = await getFormatter({ locale });
   const formattedDate = format.dateTime(new Date(post.publishedAt), {
     month: 'long',
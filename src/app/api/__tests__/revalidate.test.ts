@@ -108,6 +108,25 @@ describe('POST /api/revalidate', () => {
     expect(json.paths).toContain(`/en/blog/${slug}`);
   });
 
+  it('revalidates only the requested locales when locales are provided', async () => {
+    const slug = 'how-ai-transforms-startups';
+    const res = await POST(makeRequest({ secret: VALID_SECRET, type: 'blog', slug, locales: ['ar'] }));
+    const json = await res.json();
+
+    expect(res.status).toBe(200);
+    expect(revalidatePath).toHaveBeenCalledWith('/ar/blog');
+    expect(revalidatePath).toHaveBeenCalledWith(`/ar/blog/${slug}`);
+    expect(revalidatePath).not.toHaveBeenCalledWith('/en/blog');
+    expect(revalidatePath).not.toHaveBeenCalledWith(`/en/blog/${slug}`);
+    expect(json.paths).toEqual(['/ar/blog', `/ar/blog/${slug}`]);
+  });
+
+  it('returns 400 when locales contains an unsupported locale', async () => {
+    const res = await POST(makeRequest({ secret: VALID_SECRET, type: 'blog', locales: ['fr'] }));
+
+    expect(res.status).toBe(400);
+  });
+
   it('returns 429 when rate limited', async () => {
     vi.mocked(checkRateLimit).mockResolvedValueOnce({
       allowed: false,
@@ -5,11 +5,13 @@ import { z } from 'zod';
 import { checkRateLimit, getClientIP, setRateLimitHeaders } from '@/lib/utils/rate-limit';
 import { hashIP } from '@/lib/utils/api-helpers';
 import { logServerError } from '@/lib/firebase/error-logging';
+import { routing } from '@/lib/i18n/routing';
 
 const revalidateSchema = z.object({
   secret: z.string().min(1),
   slug: z.string().max(100).regex(/^[a-z0-9\-]+$/).optional(),
   type: z.enum(['blog']),
+  locales: z.array(z.enum(routing.locales)).min(1).optional(),
 });
 
 /** Rate limit: 10 revalidate requests per IP per hour */
@@ -21,7 +23,9 @@ const RATE_LIMIT_WINDOW = 60 * 60 * 1000;
  * Called by the cloud function after publishing a new blog post.
  *
  * Usage: POST /api/revalidate
- * Body: { secret: string, slug?: string, type: 'blog' }
+ * Body: { secret: string, slug?: string, type: 'blog', locales?: ('en' | 'ar')[] }
+ *
+ * `locales` limits revalidation to the locales whose content changed (defaults to all).
  *
  * Set REVALIDATE_SECRET in environment variables.
  */
@@ -49,7 +53,7 @@ export async function POST(request: NextRequest) {
       return NextResponse.json({ error: 'Invalid request body' }, { status: 400 });
     }
 
-    const { secret, slug, type } = parseResult.data;
+    const { secret, slug, type, locales } = parseResult.data;
 
     // 3. Timing-safe secret comparison
     const expectedSecret = process.env.REVALIDATE_SECRET;
@@ -64,17 +68,18 @@ export async function POST(request: NextRequest) {
     }
 
     if (type === 'blog') {
-      revalidatePath('/en/blog');
-      revalidatePath('/ar/blog');
-
-      if (slug) {
-        revalidatePath(`/en/blog/${slug}`);
-        revalidatePath(`/ar/blog/${slug}`);
+      const paths: string[] = [];
+      for (const locale of locales ?? routing.locales) {
+        paths.push(`/${locale}/blog`);
+        if (slug) {
+          paths.push(`/${locale}/blog/${slug}`);
+        }
       }
+      paths.forEach((path) => revalidatePath(path));
 
       const response = NextResponse.json({
         revalidated: true,
-        paths: ['/en/blog', '/ar/blog', slug ? `/en/blog/${slug}` : null].filter(Boolean),
+        paths,
         timestamp: new Date().toISOString(),
       });
       headers.forEach((v, k) => response.headers.set(k, v));
@@ -34,7 +34,8 @@ vi.mock('@/lib/firebase/admin', () => {
 });
 
 // ── Subject under test ──
-import { getBlogPosts, getBlogPost, getAllBlogSlugs } from '../blog';
+import { getBlogPosts, getBlogPost, getAllBlogSlugs, getLocalizedContent } from '../blog';
+import type { BlogPost } from '../blog';
 import { getAdminDb } from '@/lib/firebase/admin';
 
 // ── Helpers ──
@@ -165,7 +166,7 @@ describe('getBlogPost', () => {
     expect(result!.id).toBe('doc1');
     expect(result!.slug).toBe('test-post');
     expect(result!.en.title).toBe('Test Post');
-    expect(result!.ar.title).toBe('مقالة تجريبية');
+    expect(result!.ar?.title).toBe('مقالة تجريبية');
     expect(result!.tags).toEqual(['AI', 'Tech']);
   });
 
@@ -176,6 +177,19 @@ describe('getBlogPost', () => {
   });
 });
 
+describe('getLocalizedContent', () => {
+  const post = { id: 'doc1', ...mockBlogPostData } as BlogPost;
+
+  it('returns the Arabic content for locale "ar"', () => {
+    expect(getLocalizedContent(post, 'ar').title).toBe('مقالة تجريبية');
+  });
+
+  it('falls back to English when the Arabic translation is missing', () => {
+    const englishOnly: BlogPost = { ...post, ar: undefined };
+    expect(getLocalizedContent(englishOnly, 'ar').title).toBe('Test Post');
+  });
+});
+
 describe('getAllBlogSlugs', () => {
   it('returns an array of slugs from published posts', async () => {
     mockGetResolves({
@@ -1,5 +1,6 @@
 // Blog post Firestore queries — server-only (uses Firebase Admin SDK)
-// Each post has bilingual content: post.en.* and post.ar.*
+// Each post has English content (post.en.*) plus translations such as post.ar.*.
+// A translation can be missing while the generator backfills it — use getLocalizedContent.
 
 import { getAdminDb } from './admin';
 import { logServerError } from './error-logging';
@@ -22,7 +23,8 @@ export interface BlogPost {
   targetKeyword: string;
   readingTime: number;
   en: BlogPostLocalized;
-  ar: BlogPostLocalized;
+  ar?: BlogPostLocalized;
+  locales?: string[];
 }
 
 export interface BlogPostSummary {
@@ -38,6 +40,14 @@ export interface BlogPostSummary {
   excerpt: string;
 }
 
+/**
+ * Content for the requested locale, falling back to English when the
+ * translation has not been generated yet.
+ */
+export function getLocalizedContent(post: BlogPost, locale: string): BlogPostLocalized {
+  return (locale === 'ar' ? post.ar : undefined) ?? post.en;
+}
+
 /**
  * Fetch all published blog posts, ordered newest first.
  * Returns only the fields needed for the listing page.